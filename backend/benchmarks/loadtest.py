@@ -0,0 +1,333 @@
+"""Local load test for the API, with no network or remote deployment needed.
+
+Boots server.py in-process against either an in-memory Mongo stand-in
+(mongomock-motor, the default) or a local/ephemeral mongod given with
+--mongo-url. It seeds users, unlocks and stats, then drives concurrent
+request mixes through an in-process ASGI client:
+
+    login_storm       everyone logging in at once after a daily reset
+    leaderboard_poll  clients polling the leaderboard on a fixed interval
+    gacha_burst       many players opening their daily case together
+    page_load         the single bootstrap request MainPage fires on mount
+    page_load_split   the five requests MainPage fired before /bootstrap
+
+For each endpoint it reports p50/p95/p99 latency, throughput, errors and
+the Mongo operations the endpoint issued. --json writes the same report
+so results can be diffed between releases.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --users 2000 --json before.json
+    python -m benchmarks.loadtest --mongo-url mongodb://localhost:27017 --scenarios gacha_burst
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+
+# Mongo operations are attributed to whichever endpoint the driver is calling
+CURRENT_ENDPOINT = contextvars.ContextVar('current_endpoint', default='background')
+MONGO_OPS = defaultdict(Counter)
+
+COUNTED_METHODS = {
+    'find', 'find_one', 'find_one_and_update', 'aggregate', 'count_documents',
+    'insert_one', 'insert_many', 'update_one', 'update_many', 'bulk_write',
+    'delete_one', 'delete_many', 'create_indexes'
+}
+
+
+class CountingCollection:
+    """Collection proxy that counts operations per calling endpoint."""
+
+    def __init__(self, collection):
+        self._collection = collection
+
+    def __getattr__(self, name):
+        attr = getattr(self._collection, name)
+        if name not in COUNTED_METHODS:
+            return attr
+
+        def counted(*args, **kwargs):
+            MONGO_OPS[CURRENT_ENDPOINT.get()][f"{self._collection.name}.{name}"] += 1
+            return attr(*args, **kwargs)
+        return counted
+
+
+class CountingDatabase:
+    def __init__(self, database):
+        self._database = database
+
+    def __getattr__(self, name):
+        if name.startswith('_') or name in ('command', 'name', 'client', 'create_collection', 'list_collection_names'):
+            return getattr(self._database, name)
+        return CountingCollection(self._database[name])
+
+    def __getitem__(self, name):
+        return CountingCollection(self._database[name])
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = Counter()
+
+    async def call(self, client, method, path, endpoint=None, **kwargs):
+        endpoint = endpoint or f"{method} {path}"
+        token = CURRENT_ENDPOINT.set(endpoint)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        finally:
+            CURRENT_ENDPOINT.reset(token)
+        self.latencies[endpoint].append(time.perf_counter() - started)
+        if response.status_code >= 500 or response.status_code == 429:
+            self.errors[endpoint] += 1
+        return response
+
+    def report(self, wall_seconds, ops):
+        endpoints = {}
+        for endpoint, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            endpoints[endpoint] = {
+                'requests': len(values),
+                'errors': self.errors[endpoint],
+                'p50_ms': round(percentile(values, 50) * 1000, 2),
+                'p95_ms': round(percentile(values, 95) * 1000, 2),
+                'p99_ms': round(percentile(values, 99) * 1000, 2),
+                'throughput_rps': round(len(values) / wall_seconds, 1) if wall_seconds else None,
+                'mongo_ops': dict(sorted(ops.get(endpoint, {}).items())),
+                'mongo_ops_per_request': round(sum(ops.get(endpoint, {}).values()) / len(values), 2)
+            }
+        total = sum(len(values) for values in self.latencies.values())
+        return {
+            'wall_seconds': round(wall_seconds, 3),
+            'requests': total,
+            'throughput_rps': round(total / wall_seconds, 1) if wall_seconds else None,
+            'endpoints': endpoints
+        }
+
+
+async def bounded(concurrency, coroutines):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+    return await asyncio.gather(*(run(c) for c in coroutines))
+
+
+# ==================== SEEDING ====================
+
+async def seed(server, users, max_unlocks, password, bcrypt_rounds):
+    from passlib.hash import bcrypt
+
+    password_hash = bcrypt.using(rounds=bcrypt_rounds).hash(password)
+    catalog = list(server.CATALOG.fish)
+    now = datetime.now(timezone.utc).isoformat()
+    seeded = []
+    batch_users, batch_stats, batch_fish = [], [], []
+
+    async def flush():
+        if batch_users:
+            await server.db.users.insert_many(batch_users)
+            await server.db.user_stats.insert_many(batch_stats)
+        if batch_fish:
+            await server.db.user_fish.insert_many(batch_fish)
+        batch_users.clear()
+        batch_stats.clear()
+        batch_fish.clear()
+
+    for i in range(users):
+        user_id = str(uuid.uuid4())
+        email = f"load{i}@example.com"
+        owned = random.sample(catalog, random.randint(0, min(max_unlocks, len(catalog))))
+        batch_users.append({'id': user_id, 'email': email, 'password_hash': password_hash, 'created_at': now})
+        batch_stats.append({
+            'user_id': user_id,
+            'email': email,
+            'total_points': sum(f['points'] for f in owned),
+            'total_fish': len(owned),
+            'owned_bits': server.owned_bits_from_ordinals(server.CATALOG.ordinals[f['id']] for f in owned),
+            'daily_cases_used': 0,
+            'last_case_date': None
+        })
+        batch_fish.extend({'user_id': user_id, 'fish_id': f['id'], 'unlocked_at': now} for f in owned)
+        seeded.append({'user_id': user_id, 'email': email, 'token': server.create_token(user_id, email)})
+        if len(batch_users) >= 1000:
+            await flush()
+    await flush()
+    await server.refresh_leaderboard()
+    await server.rebuild_rank_index()
+    return seeded
+
+
+# ==================== SCENARIOS ====================
+
+def auth(user):
+    return {'Authorization': f"Bearer {user['token']}"}
+
+
+async def login_storm(client, recorder, users, args):
+    sample = random.sample(users, min(args.logins, len(users)))
+    await bounded(args.concurrency, [
+        recorder.call(client, 'POST', '/api/auth/login', json={'email': u['email'], 'password': args.password})
+        for u in sample
+    ])
+
+
+async def leaderboard_poll(client, recorder, users, args):
+    pollers = random.sample(users, min(args.pollers, len(users)))
+    deadline = time.monotonic() + args.duration
+
+    async def poll(user):
+        # Spread the first poll over one interval like independently opened tabs
+        await asyncio.sleep(random.uniform(0, args.poll_interval))
+        while time.monotonic() < deadline:
+            await recorder.call(client, 'GET', '/api/leaderboard', headers=auth(user))
+            await asyncio.sleep(args.poll_interval)
+    await asyncio.gather(*(poll(u) for u in pollers))
+
+
+async def gacha_burst(client, recorder, users, args):
+    sample = random.sample(users, min(args.pulls, len(users)))
+    await bounded(args.concurrency, [
+        recorder.call(client, 'POST', '/api/gacha/open', headers=auth(u)) for u in sample
+    ])
+
+
+PAGE_LOAD_PATHS = ['/api/bootstrap']
+SPLIT_PAGE_LOAD_PATHS = ['/api/fish/aquarium', '/api/fish/all', '/api/leaderboard', '/api/user/stats', '/api/gacha/status']
+
+
+async def load_pages(client, recorder, users, args, paths):
+    async def load(user):
+        await asyncio.gather(*(recorder.call(client, 'GET', path, headers=auth(user)) for path in paths))
+    await bounded(args.concurrency, [load(u) for u in random.sample(users, min(args.page_loads, len(users)))])
+
+
+async def page_load(client, recorder, users, args):
+    await load_pages(client, recorder, users, args, PAGE_LOAD_PATHS)
+
+
+async def page_load_split(client, recorder, users, args):
+    await load_pages(client, recorder, users, args, SPLIT_PAGE_LOAD_PATHS)
+
+
+SCENARIOS = {
+    'login_storm': login_storm,
+    'leaderboard_poll': leaderboard_poll,
+    'gacha_burst': gacha_burst,
+    'page_load': page_load,
+    'page_load_split': page_load_split
+}
+
+
+# ==================== DRIVER ====================
+
+def boot_server(args):
+    os.environ.setdefault('MONGO_URL', args.mongo_url or 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', args.db_name)
+    # Every simulated client shares one address, so per-IP limits would only measure themselves
+    os.environ.setdefault('RATE_LIMITS', 'false')
+    if args.mongo_url:
+        os.environ['MONGO_URL'] = args.mongo_url
+
+    import server
+
+    if not args.mongo_url:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            raise SystemExit("mongomock-motor is required for the in-memory stand-in (or pass --mongo-url)")
+        server.client = AsyncMongoMockClient()
+        server.db = server.client[args.db_name]
+    server.db = CountingDatabase(server.db)
+    return server
+
+
+async def run(args):
+    import httpx
+
+    server = boot_server(args)
+    if args.mongo_url:
+        await server.client.drop_database(args.db_name)
+
+    report = {
+        'config': {k: v for k, v in vars(args).items() if k not in ('json_path', 'password')},
+        'started_at': datetime.now(timezone.utc).isoformat(),
+        'scenarios': {}
+    }
+    transport = httpx.ASGITransport(app=server.app)
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=transport, base_url='http://loadtest', timeout=None) as client:
+            started = time.perf_counter()
+            users = await seed(server, args.users, args.max_unlocks, args.password, args.bcrypt_rounds)
+            print(f"seeded {len(users)} users in {time.perf_counter() - started:.1f}s")
+
+            for name in args.scenarios:
+                MONGO_OPS.clear()
+                recorder = Recorder()
+                started = time.perf_counter()
+                await SCENARIOS[name](client, recorder, users, args)
+                result = recorder.report(time.perf_counter() - started, MONGO_OPS)
+                report['scenarios'][name] = result
+                print_scenario(name, result)
+
+    if args.mongo_url:
+        await server.client.drop_database(args.db_name)
+    return report
+
+
+def print_scenario(name, result):
+    print(f"\n{name}: {result['requests']} requests in {result['wall_seconds']}s ({result['throughput_rps']} req/s)")
+    print(f"  {'endpoint':<26}{'n':>6}{'err':>5}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'ops/req':>9}")
+    for endpoint, row in result['endpoints'].items():
+        print(f"  {endpoint:<26}{row['requests']:>6}{row['errors']:>5}{row['p50_ms']:>9}"
+              f"{row['p95_ms']:>9}{row['p99_ms']:>9}{row['mongo_ops_per_request']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local load test for the AquaGacha API")
+    parser.add_argument('--mongo-url', help="use this mongod instead of the in-memory stand-in")
+    parser.add_argument('--db-name', default='aquagacha_loadtest')
+    parser.add_argument('--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument('--users', type=int, default=1000)
+    parser.add_argument('--max-unlocks', type=int, default=10, help="max seeded unlocks per user")
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--logins', type=int, default=100)
+    parser.add_argument('--password', default='LoadTest123!')
+    parser.add_argument('--bcrypt-rounds', type=int, default=12, help="cost of the seeded password hashes")
+    parser.add_argument('--pollers', type=int, default=200)
+    parser.add_argument('--poll-interval', type=float, default=10.0)
+    parser.add_argument('--duration', type=float, default=30.0, help="leaderboard polling duration (s)")
+    parser.add_argument('--pulls', type=int, default=500)
+    parser.add_argument('--page-loads', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=None, help="random seed for reproducible runs")
+    parser.add_argument('--json', dest='json_path', help="write the report to this file")
+    args = parser.parse_args()
+
+    if args.seed is not None:
+        random.seed(args.seed)
+
+    report = asyncio.run(run(args))
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nreport written to {args.json_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""Per-endpoint response serialization benchmark.
+
+Compares FastAPI's default response path (response_model validation,
+jsonable_encoder and JSONResponse rendering) with the trusted fast path
+used when FAST_RESPONSES is on (json_bytes straight from the documents the
+handler already shaped). Payloads have the same shape the endpoints
+return; --scale multiplies list sizes to mimic a bigger catalog and board.
+
+Run from the backend directory:
+
+    python -m benchmarks.serialization --iterations 2000 --scale 10 --json serialization.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+import uuid
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'benchmark')
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+
+import server
+
+
+def build_payloads(scale):
+    fish = [dict(f) for f in server.CATALOG.fish]
+    catalog = [dict(f, id=f"{f['id']}-{i}") for i in range(scale) for f in fish]
+    leaderboard = [
+        {
+            'rank': rank,
+            'user_id': str(uuid.uuid4()),
+            'email': f"player{rank}@example.com",
+            'total_points': 5000 - rank,
+            'total_fish': 18 - rank % 18
+        }
+        for rank in range(1, server.LEADERBOARD_SIZE * scale + 1)
+    ]
+    return {
+        '/api/fish/all': catalog,
+        '/api/leaderboard': leaderboard,
+        '/api/user/collection': catalog[:len(catalog) // 2],
+        '/api/user/stats': {'total_points': 1140, 'total_fish': 17},
+        '/api/gacha/status': {'cases_remaining': 0, 'next_reset': '2026-01-01T00:00:00'}
+    }
+
+
+def response_field(path):
+    for route in server.app.routes:
+        if getattr(route, 'path', None) == path and 'GET' in getattr(route, 'methods', ()):
+            return route.response_field
+    raise KeyError(path)
+
+
+async def default_path(field, data):
+    content = await serialize_response(field=field, response_content=data, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def fast_path(data):
+    return server.TrustedJSONResponse(data).body
+
+
+async def time_default(field, data, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        await default_path(field, data)
+    return (time.perf_counter() - started) / iterations
+
+
+def time_fast(data, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fast_path(data)
+    return (time.perf_counter() - started) / iterations
+
+
+async def run(iterations, scale):
+    results = []
+    for path, data in build_payloads(scale).items():
+        field = response_field(path)
+        # Both paths must produce the same document
+        assert json.loads(await default_path(field, data)) == json.loads(fast_path(data)), path
+
+        before = await time_default(field, data, iterations)
+        after = time_fast(data, iterations)
+        results.append({
+            'endpoint': path,
+            'items': len(data) if isinstance(data, list) else 1,
+            'default_us': round(before * 1e6, 2),
+            'fast_us': round(after * 1e6, 2),
+            'speedup': round(before / after, 1) if after else None
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=1000)
+    parser.add_argument('--scale', type=int, default=1, help="multiply list payload sizes")
+    parser.add_argument('--json', dest='json_path', help="also write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations, args.scale))
+
+    print(f"{'endpoint':<24}{'items':>7}{'default µs':>13}{'fast µs':>10}{'speedup':>9}")
+    for row in results:
+        print(f"{row['endpoint']:<24}{row['items']:>7}{row['default_us']:>13}{row['fast_us']:>10}{row['speedup']:>8}x")
+    print(f"json encoder: {'orjson' if server.orjson is not None else 'json'}")
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump({
+                'iterations': args.iterations,
+                'scale': args.scale,
+                'encoder': 'orjson' if server.orjson is not None else 'json',
+                'results': results
+            }, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,300 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Header, Query, Request, Response, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+from pymongo import ASCENDING, DESCENDING, IndexModel, InsertOne, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, CollectionInvalid, DuplicateKeyError, OperationFailure
 import os
+import sys
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional
 import uuid
+import asyncio
+import time
+import hashlib
+import bisect
+import contextvars
+import threading
+import hmac
+import ipaddress
+import secrets
+import json
+import base64
+import math
+from collections import OrderedDict, defaultdict, deque
+from itertools import islice
+from types import MappingProxyType
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from passlib.hash import bcrypt
 import jwt
 import random
+import numpy as np
+from collections.abc import Mapping
+from simulation import simulate, wilson_interval
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - redis is only needed for a shared limiter
+    redis_asyncio = None
+
+# ==================== METRICS ====================
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+def _label_text(names, values, extra: str = '') -> str:
+    pairs = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace('\\', '\\\\').replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter:
+    """Thread-safe Prometheus counter keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels: tuple = (), amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, labels)} {value}")
+        return lines
+
+class Histogram:
+    """Thread-safe Prometheus histogram keyed by label values."""
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels: tuple, value: float):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # One count per bucket, one for +Inf, then the running sum
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}")
+            cumulative += series[len(self.buckets)]
+            le = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_label_text(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {series[-1]}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route template.', ('method', 'route')
+)
+REQUESTS_TOTAL = Counter(
+    'http_requests_total', 'HTTP requests by route template and status code.', ('method', 'route', 'status')
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    'mongo_command_duration_seconds',
+    'MongoDB command latency by collection, command and triggering route.',
+    ('collection', 'command', 'route')
+)
+MONGO_COMMAND_FAILURES = Counter(
+    'mongo_command_failures_total', 'Failed MongoDB commands.', ('collection', 'command', 'route')
+)
+
+# The ASGI scope of the request being handled; Motor copies context into
+# its executor threads, so the command listener can read it too
+CURRENT_SCOPE = contextvars.ContextVar('current_scope', default=None)
+
+def route_label(scope: Optional[dict]) -> str:
+    if scope is None:
+        return 'background'
+    # FastAPI stores the matched route in the scope once routing is done
+    return getattr(scope.get('route'), 'path', None) or 'unmatched'
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Records per-collection, per-command durations for every Mongo command."""
+
+    def __init__(self):
+        self._pending = {}
+
+    def started(self, event):
+        command = event.command
+        collection = command.get(event.command_name)
+        if not isinstance(collection, str):
+            collection = command.get('collection', '')
+        self._pending[(event.connection_id, event.request_id)] = (collection, route_label(CURRENT_SCOPE.get()))
+
+    def succeeded(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending:
+            MONGO_COMMAND_LATENCY.observe((pending[0], event.command_name, pending[1]), event.duration_micros / 1e6)
+
+    def failed(self, event):
+        pending = self._pending.pop((event.connection_id, event.request_id), None)
+        if pending:
+            labels = (pending[0], event.command_name, pending[1])
+            MONGO_COMMAND_LATENCY.observe(labels, event.duration_micros / 1e6)
+            MONGO_COMMAND_FAILURES.inc(labels)
+
+class MetricsMiddleware:
+    """Pure ASGI middleware that times every HTTP request by route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+            await send(message)
+
+        token = CURRENT_SCOPE.set(scope)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            CURRENT_SCOPE.reset(token)
+            route = route_label(scope)
+            REQUEST_LATENCY.observe((scope['method'], route), elapsed)
+            REQUESTS_TOTAL.inc((scope['method'], route, str(status_code)))
+
+MONGO_COMMAND_METRICS = MongoCommandMetrics()
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '10'))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', '5000'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '300000'))
+
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(
+    mongo_url,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    event_listeners=[MONGO_COMMAND_METRICS]
+)
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
+app.state.ready = False
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer()
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key-change-in-production')
 JWT_ALGORITHM = 'HS256'
 
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', '0'))
+PROFILE_INTERVAL_SECONDS = float(os.environ.get('PROFILE_INTERVAL_MS', '1')) / 1000
+PROFILE_BUFFER_SIZE = int(os.environ.get('PROFILE_BUFFER_SIZE', '50'))
+PROFILE_MAX_ACTIVE = int(os.environ.get('PROFILE_MAX_ACTIVE', '4'))
+PROFILE_MAX_SECONDS = float(os.environ.get('PROFILE_MAX_SECONDS', '30'))
+
+AUTH_POOL_SIZE = int(os.environ.get('AUTH_POOL_SIZE', '4'))
+AUTH_POOL_MAX_QUEUE = int(os.environ.get('AUTH_POOL_MAX_QUEUE', '64'))
+
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', '10000'))
+TOKEN_CACHE_TTL_SECONDS = float(os.environ.get('TOKEN_CACHE_TTL_SECONDS', '300'))
+
+STATS_CACHE_ENABLED = os.environ.get('STATS_CACHE', 'true').lower() in ('1', 'true', 'yes')
+STATS_CACHE_SIZE = int(os.environ.get('STATS_CACHE_SIZE', '10000'))
+STATS_CACHE_TTL_SECONDS = float(os.environ.get('STATS_CACHE_TTL_SECONDS', '5'))
+
+GACHA_DAILY_CASES = int(os.environ.get('GACHA_DAILY_CASES', '1'))
+GACHA_MAX_MULTI_PULL = int(os.environ.get('GACHA_MAX_MULTI_PULL', '10'))
+# A multi-pull can never spend more than one day's quota
+MULTI_PULL_LIMIT = max(1, min(GACHA_MAX_MULTI_PULL, GACHA_DAILY_CASES))
+
+STREAM_QUEUE_SIZE = int(os.environ.get('STREAM_QUEUE_SIZE', '32'))
+STREAM_KEEPALIVE_SECONDS = float(os.environ.get('STREAM_KEEPALIVE_SECONDS', '15'))
+STREAM_TICKET_TTL_SECONDS = int(os.environ.get('STREAM_TICKET_TTL_SECONDS', '30'))
+
+RATE_LIMITS_ENABLED = os.environ.get('RATE_LIMITS', 'true').lower() in ('1', 'true', 'yes')
+RATE_LIMIT_AUTH_IP = os.environ.get('RATE_LIMIT_AUTH_IP', '30/60')
+RATE_LIMIT_AUTH_EMAIL = os.environ.get('RATE_LIMIT_AUTH_EMAIL', '10/60')
+RATE_LIMIT_GACHA_USER = os.environ.get('RATE_LIMIT_GACHA_USER', '5/1')
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '100000'))
+RATE_LIMIT_REDIS_URL = os.environ.get('RATE_LIMIT_REDIS_URL', '')
+# Peers allowed to set X-Forwarded-For: '*', or comma-separated addresses and
+# networks. The default covers loopback and private ranges, where an ingress
+# or reverse proxy normally runs; '' trusts no one.
+RATE_LIMIT_TRUSTED_PROXIES = os.environ.get(
+    'RATE_LIMIT_TRUSTED_PROXIES', '127.0.0.0/8,::1/128,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7'
+)
+ROUTE_CONCURRENCY_AUTH = int(os.environ.get('ROUTE_CONCURRENCY_AUTH', '32'))
+ROUTE_CONCURRENCY_GACHA = int(os.environ.get('ROUTE_CONCURRENCY_GACHA', '64'))
+ROUTE_QUEUE_TIMEOUT_SECONDS = float(os.environ.get('ROUTE_QUEUE_TIMEOUT_MS', '500')) / 1000
+
+FAST_RESPONSES = os.environ.get('FAST_RESPONSES', '').lower() in ('1', 'true', 'yes')
+
+WRITE_BEHIND_ENABLED = os.environ.get('WRITE_BEHIND', '').lower() in ('1', 'true', 'yes')
+WRITE_BEHIND_FLUSH_SECONDS = float(os.environ.get('WRITE_BEHIND_FLUSH_MS', '200')) / 1000
+WRITE_BEHIND_BATCH_SIZE = int(os.environ.get('WRITE_BEHIND_BATCH_SIZE', '500'))
+WRITE_BEHIND_MAX_PENDING = int(os.environ.get('WRITE_BEHIND_MAX_PENDING', '10000'))
+
+FISH_PAGE_MAX = int(os.environ.get('FISH_PAGE_MAX', '200'))
+NDJSON_BATCH_SIZE = int(os.environ.get('NDJSON_BATCH_SIZE', '256'))
+CATALOG_POLL_SECONDS = float(os.environ.get('CATALOG_POLL_SECONDS', '5'))
+
+SIMULATION_MAX_PULLS = int(os.environ.get('SIMULATION_MAX_PULLS', '50000000'))
+
+PULL_LOG_ENABLED = os.environ.get('PULL_LOG', 'true').lower() in ('1', 'true', 'yes')
+PULL_LOG_RETENTION_DAYS = int(os.environ.get('PULL_LOG_RETENTION_DAYS', '90'))
+PULL_LOG_CAPPED_MB = int(os.environ.get('PULL_LOG_CAPPED_MB', '512'))
+
+QUERY_PLAN_CHECK = os.environ.get('QUERY_PLAN_CHECK', '').lower() in ('1', 'true', 'yes')
+
+LEADERBOARD_SIZE = int(os.environ.get('LEADERBOARD_SIZE', '20'))
+LEADERBOARD_REFRESH_SECONDS = float(os.environ.get('LEADERBOARD_REFRESH_SECONDS', '30'))
+WINDOW_LEADERBOARD_TTL_SECONDS = float(os.environ.get('WINDOW_LEADERBOARD_TTL_SECONDS', '10'))
+LEADERBOARD_MAX_NEIGHBORS = int(os.environ.get('LEADERBOARD_MAX_NEIGHBORS', '25'))
+LEADERBOARD_PAGE_MAX = int(os.environ.get('LEADERBOARD_PAGE_MAX', '100'))
+RANK_REBUILD_SECONDS = float(os.environ.get('RANK_REBUILD_SECONDS', '600'))
+
 # ==================== MODELS ====================
 
 class UserRegister(BaseModel):
@@ -66,14 +333,50 @@ class GachaResult(BaseModel):
     fish: Fish
     is_new: bool
     total_points: int
+    cases_remaining: int
+
+class MultiPullRequest(BaseModel):
+    count: int = Field(default=MULTI_PULL_LIMIT, ge=1, le=MULTI_PULL_LIMIT)
+
+class GachaPull(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    fish: Fish
+    is_new: bool
+
+class MultiGachaResult(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    pulls: List[GachaPull]
+    total_points: int
+    cases_remaining: int
 
 class LeaderboardEntry(BaseModel):
     model_config = ConfigDict(extra="ignore")
+    rank: int
     user_id: str
     email: str
     total_points: int
     total_fish: int
 
+class FishPage(BaseModel):
+    items: List[Fish]
+    next_cursor: Optional[str]
+
+class LeaderboardPage(BaseModel):
+    entries: List[LeaderboardEntry]
+    next_cursor: Optional[str]
+
+class PlayerStanding(BaseModel):
+    rank: int
+    total_players: int
+    neighbors: List[LeaderboardEntry]
+
+class SimulationRequest(BaseModel):
+    players: int = Field(10000, ge=1)
+    days: int = Field(90, ge=1, le=3650)
+    pulls_per_day: int = Field(GACHA_DAILY_CASES, ge=1)
+    weights: Optional[Dict[str, float]] = None
+    seed: Optional[int] = None
+
 class GachaStatus(BaseModel):
     cases_remaining: int
     next_reset: Optional[str]
@@ -87,6 +390,13 @@ class AquariumFish(BaseModel):
     color: str
     position: List[float]
 
+class Bootstrap(BaseModel):
+    aquarium: List[AquariumFish]
+    fish: List[Fish]
+    leaderboard: List[LeaderboardEntry]
+    stats: Dict[str, int]
+    gacha: GachaStatus
+
 # ==================== HELPER FUNCTIONS ====================
 
 def create_token(user_id: str, email: str) -> str:
@@ -97,14 +407,767 @@ def create_token(user_id: str, email: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+class VerifiedTokenCache:
+    """Bounded LRU of decoded JWT payloads keyed by a digest of the token.
+
+    An entry lives for at most `ttl` seconds and never past the token's own
+    `exp`, so a cache hit is exactly as valid as a fresh `jwt.decode`.
+    """
+
+    def __init__(self, size: int, ttl: float):
+        self.size = size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, key: bytes) -> Optional[dict]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            payload, expires_at = entry
+            if time.time() < expires_at:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return payload
+            del self._entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, payload: dict):
+        expires_at = min(time.time() + self.ttl, payload['exp'])
+        self._entries[key] = (payload, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        return {
+            'size': len(self._entries),
+            'max_size': self.size,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+TOKEN_CACHE = VerifiedTokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL_SECONDS)
+
+class UserStatsCache:
+    """Bounded LRU of `user_stats` documents with a short TTL.
+
+    Every mutation increments the document's `version`, and `put` refuses a
+    document older than the one already cached, so a slow read that started
+    before a pull cannot overwrite the pull's result. Other workers'
+    changes show up once the TTL runs out.
+    """
+
+    def __init__(self, size: int, ttl: float, enabled: bool = True):
+        self.size = size
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.stale_writes = 0
+
+    def get(self, user_id: str) -> Optional[dict]:
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            stats, expires_at = entry
+            if time.monotonic() < expires_at:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return stats
+            del self._entries[user_id]
+        self.misses += 1
+        return None
+
+    def put(self, user_id: str, stats: Optional[dict]):
+        if not self.enabled or stats is None:
+            return
+        current = self._entries.get(user_id)
+        if current is not None and current[0].get('version', 0) > stats.get('version', 0):
+            self.stale_writes += 1
+            return
+        self._entries[user_id] = (stats, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def evict(self, user_id: str):
+        self._entries.pop(user_id, None)
+
+    def snapshot(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'size': len(self._entries),
+            'max_size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'stale_writes': self.stale_writes
+        }
+
+STATS_CACHE = UserStatsCache(STATS_CACHE_SIZE, STATS_CACHE_TTL_SECONDS, STATS_CACHE_ENABLED)
+
+async def get_stats_doc(user_id: str) -> Optional[dict]:
+    """The user's stats document, read through the per-worker cache. Treat as read-only."""
+    if STATS_CACHE.enabled:
+        stats = STATS_CACHE.get(user_id)
+        if stats is not None:
+            return stats
+    stats = await db.user_stats.find_one({'user_id': user_id}, {'_id': 0})
+    STATS_CACHE.put(user_id, stats)
+    return stats
+
+def decode_token(token: str) -> dict:
+    key = VerifiedTokenCache.key(token)
+    payload = TOKEN_CACHE.get(key)
+    if payload is not None:
         return payload
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    TOKEN_CACHE.put(key, payload)
+    return payload
+
+# Async so the token cache is only ever touched from the event loop thread
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return decode_token(credentials.credentials)
+
+def verify_admin(x_admin_token: Optional[str] = Header(default=None)):
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+def _json_default(value):
+    # Catalog entries are read-only mapping proxies
+    if isinstance(value, Mapping):
+        return dict(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def json_bytes(data) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default)
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'), default=_json_default).encode()
+
+class TrustedJSONResponse(Response):
+    """JSON response for documents that already match their response model."""
+    media_type = 'application/json'
+
+    def render(self, content) -> bytes:
+        return json_bytes(content)
+
+def trusted_response(data):
+    """Return `data` straight as JSON bytes when FAST_RESPONSES is on.
+
+    Returning a Response makes FastAPI skip response_model validation and
+    jsonable_encoder, so only use this for data the server shaped itself.
+    """
+    if FAST_RESPONSES:
+        return TrustedJSONResponse(data)
+    return data
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+def etag_response(request: Request, body: bytes, etag: str, cache_control: str = 'private, no-cache') -> Response:
+    """Send a pre-serialized JSON body, or 304 if the client already has it."""
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match and (if_none_match.strip() == '*' or etag in [t.strip() for t in if_none_match.split(',')]):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type='application/json', headers=headers)
+
+class AuthWorkerPool:
+    """Bounded thread pool for bcrypt hashing and verification.
+
+    bcrypt releases the GIL while hashing, so worker threads keep the event
+    loop responsive. Once `size` jobs are running and `max_queue` more are
+    waiting, new requests are rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, size: int, max_queue: int):
+        self.size = size
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='auth')
+        self._pending = 0
+        self.jobs = 0
+        self.rejected = 0
+        self.queue_wait_seconds = 0.0
+        self.max_queue_wait_seconds = 0.0
+        self.hash_seconds = 0.0
+        self.max_hash_seconds = 0.0
+
+    async def run(self, fn, *args):
+        if self._pending >= self.size + self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Authentication is busy, please retry",
+                headers={'Retry-After': '1'}
+            )
+
+        submitted = time.perf_counter()
+
+        def job():
+            started = time.perf_counter()
+            result = fn(*args)
+            return result, started - submitted, time.perf_counter() - started
+
+        self._pending += 1
+        try:
+            result, waited, elapsed = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+
+        AUTH_QUEUE_WAIT.observe((fn.__name__,), waited)
+        AUTH_HASH_TIME.observe((fn.__name__,), elapsed)
+        self.jobs += 1
+        self.queue_wait_seconds += waited
+        self.max_queue_wait_seconds = max(self.max_queue_wait_seconds, waited)
+        self.hash_seconds += elapsed
+        self.max_hash_seconds = max(self.max_hash_seconds, elapsed)
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(bcrypt.hash, password)
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        return await self.run(bcrypt.verify, password, password_hash)
+
+    def snapshot(self) -> dict:
+        return {
+            'size': self.size,
+            'max_queue': self.max_queue,
+            'pending': self._pending,
+            'jobs': self.jobs,
+            'rejected': self.rejected,
+            'queue_wait_seconds_total': self.queue_wait_seconds,
+            'queue_wait_seconds_max': self.max_queue_wait_seconds,
+            'hash_seconds_total': self.hash_seconds,
+            'hash_seconds_max': self.max_hash_seconds
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
+
+AUTH_QUEUE_WAIT = Histogram('auth_queue_wait_seconds', 'Time bcrypt jobs waited for an auth worker.', ('operation',))
+AUTH_HASH_TIME = Histogram('auth_hash_seconds', 'Time spent in bcrypt on an auth worker.', ('operation',))
+
+AUTH_POOL = AuthWorkerPool(AUTH_POOL_SIZE, AUTH_POOL_MAX_QUEUE)
+
+# ==================== RATE LIMITING ====================
+
+def parse_rate(rate: str) -> tuple:
+    """Parse "requests/seconds" into a bucket capacity and refill per second."""
+    requests, _, seconds = rate.partition('/')
+    capacity = int(requests)
+    return capacity, capacity / float(seconds or 1)
+
+RATE_LIMIT_RULES = {
+    'auth_ip': parse_rate(RATE_LIMIT_AUTH_IP),
+    'auth_email': parse_rate(RATE_LIMIT_AUTH_EMAIL),
+    'gacha_user': parse_rate(RATE_LIMIT_GACHA_USER)
+}
+
+class TokenBucketLimiter:
+    """In-process token buckets, one per key, least recently used evicted.
+
+    A missing bucket is a full one, so evicting idle keys only ever errs
+    towards letting a request through.
+    """
+    backend = 'memory'
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+
+    async def take(self, key: str, capacity: int, per_second: float) -> float:
+        """Spend one token; returns 0 if allowed, else seconds until one is available."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * per_second)
+        retry_after = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            retry_after = (1 - tokens) / per_second
+        self._buckets[key] = (tokens, now)
+        if len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return retry_after
+
+    def size(self) -> int:
+        return len(self._buckets)
+
+class RedisTokenBucketLimiter:
+    """Token buckets shared by every worker, updated atomically by a Lua script."""
+    backend = 'redis'
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local per_second = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * per_second)
+    local retry_after = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        retry_after = (1 - tokens) / per_second
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / per_second * 1000))
+    return tostring(retry_after)
+    """
+
+    def __init__(self, url: str):
+        self._redis = redis_asyncio.from_url(url)
+        self._script = self._redis.register_script(self.SCRIPT)
+
+    async def take(self, key: str, capacity: int, per_second: float) -> float:
+        try:
+            retry_after = await self._script(keys=[f"ratelimit:{key}"], args=[capacity, per_second, time.time()])
+        except Exception:
+            # A limiter outage must not take logins down with it
+            logging.exception("Rate limiter backend failed, allowing request")
+            return 0.0
+        return float(retry_after)
+
+    def size(self) -> Optional[int]:
+        return None
+
+def build_rate_limiter():
+    if not RATE_LIMIT_REDIS_URL:
+        return TokenBucketLimiter(RATE_LIMIT_MAX_KEYS)
+    if redis_asyncio is None:
+        raise RuntimeError("RATE_LIMIT_REDIS_URL is set but the redis package is not installed")
+    return RedisTokenBucketLimiter(RATE_LIMIT_REDIS_URL)
+
+RATE_LIMITER = build_rate_limiter()
+RATE_LIMITED = Counter('rate_limited_total', 'Requests rejected by a rate limit.', ('rule',))
+
+async def enforce_rate_limit(rule: str, key: str):
+    if not RATE_LIMITS_ENABLED:
+        return
+    capacity, per_second = RATE_LIMIT_RULES[rule]
+    retry_after = await RATE_LIMITER.take(f"{rule}:{key}", capacity, per_second)
+    if retry_after:
+        RATE_LIMITED.inc((rule,))
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests, please slow down",
+            headers={'Retry-After': str(math.ceil(retry_after))}
+        )
+
+def parse_trusted_proxies(text: str):
+    """`True` for '*', otherwise a tuple of networks."""
+    if text.strip() == '*':
+        return True
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in text.split(',') if part.strip())
+
+TRUSTED_PROXIES = parse_trusted_proxies(RATE_LIMIT_TRUSTED_PROXIES)
+
+def is_trusted_proxy(address: str) -> bool:
+    if TRUSTED_PROXIES is True:
+        return True
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in TRUSTED_PROXIES)
+
+def client_ip(request: Request) -> str:
+    """Address of the client, looking through trusted proxies.
+
+    X-Forwarded-For is walked from the right, because only the entries
+    appended by trusted proxies can be believed. The first untrusted hop
+    is the client; anything left of it may be forged.
+    """
+    peer = request.client.host if request.client else 'unknown'
+    if not is_trusted_proxy(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get('x-forwarded-for', '').split(',') if hop.strip()]
+    for hop in reversed(hops):
+        if not is_trusted_proxy(hop):
+            return hop
+    return hops[0] if hops else peer
+
+async def limit_auth_ip(request: Request):
+    await enforce_rate_limit('auth_ip', client_ip(request))
+
+async def limit_gacha_user(user: dict = Depends(verify_token)):
+    await enforce_rate_limit('gacha_user', user['user_id'])
+
+class RouteConcurrencyLimit:
+    """Caps in-flight requests for a route; waiters give up after `queue_timeout`.
+
+    Shedding with 503 once the queue wait runs out keeps a burst from
+    stacking up requests that would time out at the client anyway.
+    """
+
+    def __init__(self, name: str, limit: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.in_flight = 0
+
+    async def __aenter__(self):
+        if self._semaphore.locked():
+            try:
+                if self.queue_timeout <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait_for(self._semaphore.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                ROUTE_SHED.inc((self.name,))
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server is busy, please retry",
+                    headers={'Retry-After': '1'}
+                )
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+
+    async def __aexit__(self, *exc_info):
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def snapshot(self) -> dict:
+        return {'limit': self.limit, 'in_flight': self.in_flight}
+
+ROUTE_SHED = Counter('route_shed_total', 'Requests shed because a route stayed at its concurrency cap.', ('route',))
+ROUTE_LIMITS = {
+    'auth': RouteConcurrencyLimit('auth', ROUTE_CONCURRENCY_AUTH, ROUTE_QUEUE_TIMEOUT_SECONDS),
+    'gacha': RouteConcurrencyLimit('gacha', ROUTE_CONCURRENCY_GACHA, ROUTE_QUEUE_TIMEOUT_SECONDS)
+}
+
+def route_slot(name: str):
+    """Dependency that holds one of the route's concurrency slots for the request."""
+    limit = ROUTE_LIMITS[name]
+
+    async def slot():
+        async with limit:
+            yield
+
+    return slot
+
+# ==================== PROFILING ====================
+
+def _frame_key(frame) -> tuple:
+    code = frame.f_code
+    return (getattr(code, 'co_qualname', code.co_name), code.co_filename, code.co_firstlineno)
+
+AWAITING_FRAME = ('(awaiting)', '', 0)
+
+class RequestSampler(threading.Thread):
+    """Samples one request's stack from a background thread.
+
+    On every tick it checks whether the request's task is the one running
+    on the event loop. If so, the loop thread's live stack is recorded.
+    Otherwise the suspended coroutine chain is recorded, ending in an
+    `(awaiting)` frame. Interleaved requests do not pollute the profile,
+    and time spent waiting on Mongo or bcrypt is attributed to the await
+    that caused it.
+    """
+
+    def __init__(self, task: asyncio.Task, loop, interval: float):
+        super().__init__(name='request-profiler', daemon=True)
+        self.task = task
+        self.loop = loop
+        self.loop_thread_id = threading.get_ident()
+        self.interval = interval
+        # Long-lived responses such as the event stream stop being sampled eventually
+        self.max_samples = max(1, int(PROFILE_MAX_SECONDS / interval))
+        self.samples = []
+        self._stopped = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while len(self.samples) < self.max_samples and not self._stopped.wait(self.interval):
+            now = time.perf_counter()
+            stack = self._sample()
+            if stack:
+                self.samples.append((stack, now - last))
+            last = now
+
+    def _sample(self) -> tuple:
+        # Read-only peeks at interpreter and asyncio state from another thread
+        if asyncio.tasks._current_tasks.get(self.loop) is self.task:
+            frame = sys._current_frames().get(self.loop_thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_key(frame))
+                frame = frame.f_back
+            return tuple(reversed(stack))
+        stack = []
+        awaitable = self.task.get_coro()
+        while awaitable is not None:
+            frame = getattr(awaitable, 'cr_frame', None) or getattr(awaitable, 'gi_frame', None)
+            if frame is None:
+                break
+            stack.append(_frame_key(frame))
+            awaitable = getattr(awaitable, 'cr_await', None) or getattr(awaitable, 'gi_yieldfrom', None)
+        return tuple(stack) + (AWAITING_FRAME,) if stack else ()
+
+    def stop(self):
+        self._stopped.set()
+        self.join()
+
+def speedscope_profile(name: str, samples: List[tuple]) -> dict:
+    """Convert (stack, seconds) samples into a speedscope sampled profile."""
+    frames, index = [], {}
+    stacks, weights = [], []
+    for stack, seconds in samples:
+        ids = []
+        for key in stack:
+            if key not in index:
+                index[key] = len(frames)
+                frames.append({'name': key[0], 'file': key[1], 'line': key[2]})
+            ids.append(index[key])
+        stacks.append(ids)
+        weights.append(round(seconds * 1000, 3))
+    return {
+        '$schema': 'https://www.speedscope.app/file-format-schema.json',
+        'name': name,
+        'exporter': 'aquagacha',
+        'shared': {'frames': frames},
+        'profiles': [{
+            'type': 'sampled',
+            'name': name,
+            'unit': 'milliseconds',
+            'startValue': 0,
+            'endValue': round(sum(weights), 3),
+            'samples': stacks,
+            'weights': weights
+        }]
+    }
+
+PROFILES = deque(maxlen=PROFILE_BUFFER_SIZE)
+PROFILE_HEADER = b'x-profile-token'
+
+class ProfilingMiddleware:
+    """Profiles requests that carry the admin profile header or win the sampling draw.
+
+    Other requests only pay for a header scan; nothing is started for them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active = 0
+
+    def _trigger(self, scope) -> Optional[str]:
+        if ADMIN_TOKEN:
+            for name, value in scope['headers']:
+                if name == PROFILE_HEADER:
+                    if hmac.compare_digest(value, ADMIN_TOKEN.encode()):
+                        return 'header'
+                    break
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return 'sampled'
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        trigger = self._trigger(scope)
+        if trigger is None or self.active >= PROFILE_MAX_ACTIVE:
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message['type'] == 'http.response.start':
+                status_code = message['status']
+                if trigger == 'header':
+                    message['headers'] = list(message.get('headers', [])) + [(b'x-profile-id', profile_id.encode())]
+            await send(message)
+
+        sampler = RequestSampler(asyncio.current_task(), asyncio.get_running_loop(), PROFILE_INTERVAL_SECONDS)
+        self.active += 1
+        started_at = datetime.now(timezone.utc)
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop()
+            self.active -= 1
+            duration = time.perf_counter() - started
+            name = f"{scope['method']} {scope['path']}"
+            PROFILES.append({
+                'id': profile_id,
+                'method': scope['method'],
+                'path': scope['path'],
+                'route': route_label(scope),
+                'status': status_code,
+                'trigger': trigger,
+                'started_at': started_at.isoformat(),
+                'duration_ms': round(duration * 1000, 3),
+                'samples': len(sampler.samples),
+                'speedscope': speedscope_profile(name, sampler.samples)
+            })
+
+# ==================== WARM-UP ====================
+
+async def warm_connection_pool():
+    """Open MONGO_MIN_POOL_SIZE connections before serving traffic.
+
+    Concurrent pings each need their own connection, so the pool (and any
+    TLS handshakes) is fully set up before the first real request.
+    """
+    started = time.perf_counter()
+    await asyncio.gather(*(db.command('ping') for _ in range(max(MONGO_MIN_POOL_SIZE, 1))))
+    logging.info(f"Mongo pool warmed with {MONGO_MIN_POOL_SIZE} connections in {time.perf_counter() - started:.3f}s")
+
+# ==================== INDEXES ====================
+
+INDEXES = {
+    'users': [
+        IndexModel([('email', ASCENDING)], unique=True, name='email_unique'),
+        IndexModel([('id', ASCENDING)], unique=True, name='id_unique')
+    ],
+    'user_stats': [
+        IndexModel([('user_id', ASCENDING)], unique=True, name='user_id_unique'),
+        IndexModel(
+            [('total_points', DESCENDING), ('total_fish', DESCENDING), ('user_id', ASCENDING)],
+            name='leaderboard'
+        )
+    ],
+    'user_fish': [
+        IndexModel([('user_id', ASCENDING), ('fish_id', ASCENDING)], unique=True, name='user_fish_unique')
+    ],
+    'fish': [
+        IndexModel([('id', ASCENDING)], unique=True, name='id_unique')
+    ],
+    'score_buckets': [
+        IndexModel([('window', ASCENDING), ('period', ASCENDING), ('user_id', ASCENDING)], unique=True, name='bucket_unique'),
+        IndexModel(
+            [('window', ASCENDING), ('period', ASCENDING), ('points', DESCENDING), ('fish', DESCENDING), ('user_id', ASCENDING)],
+            name='window_leaderboard'
+        ),
+        IndexModel([('expires_at', ASCENDING)], expireAfterSeconds=0, name='expires_at_ttl')
+    ],
+    'pull_log': [
+        IndexModel([('user_id', ASCENDING), ('ts', DESCENDING)], name='user_history')
+    ],
+    'pull_rollups': [
+        IndexModel([('hour', ASCENDING)], unique=True, name='hour_unique')
+    ],
+    'stream_tickets': [
+        IndexModel([('expires_at', ASCENDING)], expireAfterSeconds=0, name='expires_at_ttl')
+    ]
+}
+
+# Unique indexes whose duplicate rows are interchangeable, with the order that
+# picks the row to keep. Duplicates under any other unique index need a
+# human, so startup refuses to continue instead.
+DEDUPE_KEEP = {
+    ('user_fish', 'user_fish_unique'): [('unlocked_at', ASCENDING)]
+}
+
+async def remove_duplicates(collection: str, index: dict):
+    """Clear rows that would stop `index` from being built on existing data.
+
+    Rows predating the index can repeat its key, e.g. user_fish rows from
+    the old find-then-insert race on a double click.
+    """
+    name = index['name']
+    keep = DEDUPE_KEEP.get((collection, name))
+    pipeline = [{'$sort': dict(keep + [('_id', ASCENDING)])}] if keep else []
+    pipeline += [
+        {'$group': {'_id': {field: f'${field}' for field in index['key']}, 'ids': {'$push': '$_id'}}},
+        {'$match': {'ids.1': {'$exists': True}}}
+    ]
+    groups = await db[collection].aggregate(pipeline, allowDiskUse=True).to_list(None)
+    if not groups:
+        return
+    if keep is None:
+        sample = [group['_id'] for group in groups[:20]]
+        logging.error(f"Duplicate {collection} keys block unique index {name}: {sample}")
+        raise RuntimeError(
+            f"Cannot build unique index {name} on {collection}: {len(groups)} keys are duplicated "
+            f"(first ones: {sample}). Remove the duplicates and restart."
+        )
+    extra = [row_id for group in groups for row_id in group['ids'][1:]]
+    for start in range(0, len(extra), 1000):
+        await db[collection].delete_many({'_id': {'$in': extra[start:start + 1000]}})
+    logging.warning(f"Removed {len(extra)} duplicate {collection} rows before building {name}")
+
+async def ensure_indexes():
+    for collection, models in INDEXES.items():
+        existing = await db[collection].index_information()
+        for model in models:
+            index = model.document
+            if index.get('unique') and index['name'] not in existing:
+                await remove_duplicates(collection, index)
+        # create_indexes is a no-op for indexes that already exist with the same spec
+        await db[collection].create_indexes(models)
+    logging.info("Indexes ensured")
+
+def query_plan_shapes() -> dict:
+    """One representative explain command per hot query in the endpoints."""
+    return {
+        'users by email': {'find': 'users', 'filter': {'email': 'plan@check.local'}},
+        'users by id': {'find': 'users', 'filter': {'id': 'plan-check'}},
+        'user_stats by user_id': {'find': 'user_stats', 'filter': {'user_id': 'plan-check'}},
+        'user_stats leaderboard': {
+            'find': 'user_stats',
+            'filter': {},
+            'sort': {'total_points': -1, 'total_fish': -1, 'user_id': 1},
+            'limit': LEADERBOARD_SIZE
+        },
+        'user_stats leaderboard page': {
+            'find': 'user_stats',
+            'filter': leaderboard_after(('plan-check', 100, 5)),
+            'sort': {'total_points': -1, 'total_fish': -1, 'user_id': 1},
+            'limit': LEADERBOARD_PAGE_MAX + 1
+        },
+        'score_buckets window leaderboard': {
+            'find': 'score_buckets',
+            'filter': {'window': 'week', 'period': '2026-W01'},
+            'sort': {'points': -1, 'fish': -1, 'user_id': 1},
+            'limit': LEADERBOARD_SIZE
+        },
+        'user_fish by user': {'find': 'user_fish', 'filter': {'user_id': 'plan-check'}},
+        'user_fish by user and fish': {
+            'find': 'user_fish',
+            'filter': {'user_id': 'plan-check', 'fish_id': '1'}
+        },
+        'fish by id': {'find': 'fish', 'filter': {'id': '1'}}
+    }
+
+def _plan_stages(plan):
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _plan_stages(value)
+    elif isinstance(plan, list):
+        for item in plan:
+            yield from _plan_stages(item)
+
+async def verify_query_plans():
+    """Explain every hot query shape and fail startup if any needs a COLLSCAN."""
+    failures = []
+    for name, command in query_plan_shapes().items():
+        explain = await db.command('explain', command, verbosity='queryPlanner')
+        if 'COLLSCAN' in set(_plan_stages(explain['queryPlanner']['winningPlan'])):
+            failures.append(f"{name} ({command['find']})")
+    if failures:
+        raise RuntimeError(f"Queries fall back to COLLSCAN: {', '.join(failures)}")
+    logging.info(f"Query plans verified for {len(query_plan_shapes())} query shapes")
 
 # ==================== FISH DATA INITIALIZATION ====================
 
@@ -137,256 +1200,1770 @@ RARITY_WEIGHTS = {
     'mythical': 1
 }
 
-AQUARIUM_CACHE = {'fish': [], 'timestamp': None}
+AQUARIUM_EPOCH_SECONDS = 30 * 60
+AQUARIUM_SEED = os.environ.get('AQUARIUM_SEED', 'aquarium')
+AQUARIUM_CACHE = {'epoch': None, 'fish': [], 'body': b'', 'etag': None}
 
 async def init_fish_data():
     count = await db.fish.count_documents({})
     if count == 0:
-        await db.fish.insert_many(FISH_DATA)
+        await db.fish.insert_many([dict(fish, ordinal=i) for i, fish in enumerate(FISH_DATA)])
         logging.info(f"Initialized {len(FISH_DATA)} fish")
 
+class AliasSampler:
+    """Walker/Vose alias table for O(1) weighted draws.
+
+    Building the table is O(n) and only happens when the catalog or the
+    weights change; every draw afterwards costs the same regardless of
+    catalog size.
+    """
+
+    def __init__(self, items: List[dict], weights: List[float]):
+        n = len(items)
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        prob = [1.0] * n
+        alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] += scaled[less] - 1.0
+            (small if scaled[more] < 1.0 else large).append(more)
+
+        self.items = items
+        self.probabilities = [weight / total for weight in weights]
+        self._prob = prob
+        self._alias = alias
+        self._prob_array = np.array(prob)
+        self._alias_array = np.array(alias)
+        self._rng = np.random.default_rng()
+
+    def draw(self) -> dict:
+        column = random.randrange(len(self.items))
+        if random.random() < self._prob[column]:
+            return self.items[column]
+        return self.items[self._alias[column]]
+
+    def draw_many(self, k: int) -> List[dict]:
+        columns = self._rng.integers(0, len(self.items), size=k)
+        accepted = self._rng.random(k) < self._prob_array[columns]
+        picks = np.where(accepted, columns, self._alias_array[columns])
+        return [self.items[i] for i in picks.tolist()]
+
+def build_gacha_sampler(catalog: List[dict], weights: dict) -> AliasSampler:
+    return AliasSampler(catalog, [weights[fish['rarity']] for fish in catalog])
+
+GACHA_SAMPLER = build_gacha_sampler(FISH_DATA, RARITY_WEIGHTS)
+
+def rebuild_gacha_sampler(catalog: List[dict], weights: dict):
+    """Swap in a new alias table after the catalog or rarity weights change."""
+    global GACHA_SAMPLER
+    GACHA_SAMPLER = build_gacha_sampler(catalog, weights)
+
 def get_random_fish_by_rarity():
-    weights = []
-    fish_list = []
-    for fish in FISH_DATA:
-        fish_list.append(fish)
-        weights.append(RARITY_WEIGHTS[fish['rarity']])
-    
-    return random.choices(fish_list, weights=weights, k=1)[0]
+    return GACHA_SAMPLER.draw()
 
-def get_aquarium_fish():
-    now = datetime.now(timezone.utc)
-    if AQUARIUM_CACHE['timestamp'] is None or (now - AQUARIUM_CACHE['timestamp']) > timedelta(minutes=30):
-        selected_fish = random.sample(FISH_DATA, min(8, len(FISH_DATA)))
-        AQUARIUM_CACHE['fish'] = [
-            {
-                'id': f['id'],
-                'name': f['name'],
-                'species': f['species'],
-                'rarity': f['rarity'],
-                'color': f['color'],
-                'position': [
-                    random.uniform(-8, 8),
-                    random.uniform(-4, 4),
-                    random.uniform(-3, 3)
-                ]
-            }
-            for f in selected_fish
-        ]
-        AQUARIUM_CACHE['timestamp'] = now
+def aquarium_epoch() -> int:
+    return int(time.time() // AQUARIUM_EPOCH_SECONDS)
+
+def build_aquarium(epoch: int) -> List[dict]:
+    """Pick the tank for a 30-minute epoch.
+
+    The RNG is seeded from the epoch number alone, so every worker and
+    replica computes the same tank without sharing any state.
+    """
+    rng = random.Random(f"{AQUARIUM_SEED}:{epoch}")
+    selected_fish = rng.sample(CATALOG.fish, min(8, len(CATALOG.fish)))
+    return [
+        {
+            'id': f['id'],
+            'name': f['name'],
+            'species': f['species'],
+            'rarity': f['rarity'],
+            'color': f['color'],
+            'position': [
+                rng.uniform(-8, 8),
+                rng.uniform(-4, 4),
+                rng.uniform(-3, 3)
+            ]
+        }
+        for f in selected_fish
+    ]
+
+def get_aquarium_fish() -> dict:
+    epoch = aquarium_epoch()
+    if AQUARIUM_CACHE['epoch'] != epoch:
+        fish = build_aquarium(epoch)
+        body = json_bytes(fish)
+        AQUARIUM_CACHE.update(epoch=epoch, fish=fish, body=body, etag=make_etag(body))
         logging.info("Aquarium refreshed")
-    return AQUARIUM_CACHE['fish']
+    return AQUARIUM_CACHE
 
-# ==================== AUTH ENDPOINTS ====================
+# ==================== FISH CATALOG ====================
 
-@api_router.post("/auth/register", response_model=Token)
-async def register(user_data: UserRegister):
-    existing = await db.users.find_one({'email': user_data.email}, {'_id': 0})
-    if existing:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    user_id = str(uuid.uuid4())
-    password_hash = bcrypt.hash(user_data.password)
-    
-    user_doc = {
-        'id': user_id,
-        'email': user_data.email,
-        'password_hash': password_hash,
-        'created_at': datetime.now(timezone.utc).isoformat()
-    }
-    
-    await db.users.insert_one(user_doc)
-    
-    stats_doc = {
-        'user_id': user_id,
-        'total_points': 0,
-        'total_fish': 0,
-        'daily_cases_used': 0,
-        'last_case_date': None
-    }
-    await db.user_stats.insert_one(stats_doc)
-    
-    token = create_token(user_id, user_data.email)
-    return Token(token=token, user_id=user_id, email=user_data.email)
+class FishCatalog:
+    """Immutable in-process snapshot of the fish catalog.
 
-@api_router.post("/auth/login", response_model=Token)
-async def login(user_data: UserLogin):
-    user = await db.users.find_one({'email': user_data.email}, {'_id': 0})
-    if not user or not bcrypt.verify(user_data.password, user['password_hash']):
-        raise HTTPException(status_code=401, detail="Invalid email or password")
-    
-    token = create_token(user['id'], user['email'])
-    return Token(token=token, user_id=user['id'], email=user['email'])
+    Fish are indexed by id and by rarity, and the JSON bodies for the full
+    list and for every single fish are serialized once up front together
+    with their ETags. Reloading builds a new instance and swaps it in.
+    """
 
-# ==================== FISH ENDPOINTS ====================
+    def __init__(self, docs: List[dict]):
+        docs = sorted(docs, key=lambda doc: doc['ordinal'])
+        fish = [Fish(**doc).model_dump() for doc in docs]
 
-@api_router.get("/fish/aquarium", response_model=List[AquariumFish])
-async def get_aquarium(user: dict = Depends(verify_token)):
-    fish = get_aquarium_fish()
-    return fish
+        self.list_body = json_bytes(fish)
+        self.list_etag = make_etag(self.list_body)
+        bodies = {}
+        for f in fish:
+            body = json_bytes(f)
+            bodies[f['id']] = (body, make_etag(body))
+        self.fish_bodies = MappingProxyType(bodies)
 
-@api_router.get("/fish/all", response_model=List[Fish])
-async def get_all_fish(user: dict = Depends(verify_token)):
-    fish = await db.fish.find({}, {'_id': 0}).to_list(100)
-    return fish
+        self.fish = tuple(MappingProxyType(f) for f in fish)
+        self.by_id = MappingProxyType({f['id']: f for f in self.fish})
+        # Ordinals are persisted on the fish documents and handed out from a
+        # high-water mark in catalog_meta, so they are never reused and
+        # ownership bits stay valid when species are added or removed
+        self.ordinals = MappingProxyType({doc['id']: doc['ordinal'] for doc in docs})
+        self.by_ordinal = MappingProxyType({doc['ordinal']: f for doc, f in zip(docs, self.fish)})
+        by_rarity, by_habitat = {}, {}
+        for f in self.fish:
+            by_rarity.setdefault(f['rarity'], []).append(f)
+            by_habitat.setdefault(f['habitat'], []).append(f)
+        self.by_rarity = MappingProxyType({rarity: tuple(items) for rarity, items in by_rarity.items()})
+        self.by_habitat = MappingProxyType({habitat: tuple(items) for habitat, items in by_habitat.items()})
 
-@api_router.get("/fish/{fish_id}", response_model=Fish)
-async def get_fish_detail(fish_id: str, user: dict = Depends(verify_token)):
-    fish = await db.fish.find_one({'id': fish_id}, {'_id': 0})
-    if not fish:
-        raise HTTPException(status_code=404, detail="Fish not found")
-    return fish
+    def select(self, rarity: Optional[str] = None, habitat: Optional[str] = None) -> tuple:
+        """Fish matching the filters, in ordinal order, starting from the smaller index."""
+        if rarity is None and habitat is None:
+            return self.fish
+        if habitat is None:
+            return self.by_rarity.get(rarity, ())
+        if rarity is None:
+            return self.by_habitat.get(habitat, ())
+        by_rarity, by_habitat = self.by_rarity.get(rarity, ()), self.by_habitat.get(habitat, ())
+        if len(by_rarity) <= len(by_habitat):
+            return tuple(f for f in by_rarity if fish_matches(f, rarity, habitat))
+        return tuple(f for f in by_habitat if fish_matches(f, rarity, habitat))
 
-# ==================== GACHA ENDPOINTS ====================
+CATALOG = FishCatalog([dict(fish, ordinal=i) for i, fish in enumerate(FISH_DATA)])
 
-@api_router.get("/gacha/status", response_model=GachaStatus)
-async def get_gacha_status(user: dict = Depends(verify_token)):
-    stats = await db.user_stats.find_one({'user_id': user['user_id']}, {'_id': 0})
-    if not stats:
-        return GachaStatus(cases_remaining=1, next_reset=None)
+# Version of the catalog this worker has loaded. A reload bumps the shared
+# counter in `catalog_meta`, and every worker polls it, so all workers
+# serve the same catalog, weights and tank within CATALOG_POLL_SECONDS.
+CATALOG_VERSION = None
+
+def _fish_id_sort_key(fish_id: str):
+    return (0, int(fish_id), '') if fish_id.isdigit() else (1, 0, fish_id)
+
+async def catalog_version() -> int:
+    meta = await db.catalog_meta.find_one({'_id': 'catalog'})
+    return meta.get('version', 0) if meta else 0
+
+async def bump_catalog_version() -> int:
+    meta = await db.catalog_meta.find_one_and_update(
+        {'_id': 'catalog'}, {'$inc': {'version': 1}}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return meta['version']
+
+async def reserve_ordinals(docs: List[dict], count: int) -> int:
+    """Reserve `count` unused ordinals and return the first.
+
+    `next_ordinal` in `catalog_meta` only ever grows, so the ordinal of a
+    removed species is never handed out again. Every load raises it past
+    the ordinals stored, even with nothing to number, so it has seen a
+    species before that species can be removed.
+    """
+    highest = max((doc['ordinal'] for doc in docs if 'ordinal' in doc), default=-1)
+    await db.catalog_meta.update_one({'_id': 'catalog'}, {'$max': {'next_ordinal': highest + 1}}, upsert=True)
+    if not count:
+        return highest + 1
+    meta = await db.catalog_meta.find_one_and_update(
+        {'_id': 'catalog'}, {'$inc': {'next_ordinal': count}}, return_document=ReturnDocument.AFTER
+    )
+    return meta['next_ordinal'] - count
+
+async def load_catalog():
+    """(Re)load the catalog from Mongo and rebuild everything derived from it."""
+    global CATALOG, CATALOG_VERSION
+    # Read before the fish, so a reload that lands in between is picked up by the next poll
+    version = await catalog_version()
+    docs = await db.fish.find({}, {'_id': 0}).to_list(None)
+
+    # Species added without an ordinal get fresh ones, in id order
+    unassigned = sorted((doc for doc in docs if 'ordinal' not in doc), key=lambda doc: _fish_id_sort_key(doc['id']))
+    first = await reserve_ordinals(docs, len(unassigned))
+    for ordinal, doc in enumerate(unassigned, start=first):
+        result = await db.fish.update_one(
+            {'id': doc['id'], 'ordinal': {'$exists': False}}, {'$set': {'ordinal': ordinal}}
+        )
+        if result.modified_count:
+            doc['ordinal'] = ordinal
+        else:
+            # Another worker numbered it first; this reservation is simply skipped
+            doc['ordinal'] = (await db.fish.find_one({'id': doc['id']}, {'_id': 0, 'ordinal': 1}))['ordinal']
+
+    CATALOG = FishCatalog(docs)
+    rebuild_gacha_sampler(list(CATALOG.fish), RARITY_WEIGHTS)
+    AQUARIUM_CACHE['epoch'] = None
+    CATALOG_VERSION = version
+    logging.info(f"Catalog version {version} loaded with {len(CATALOG.fish)} fish")
+
+async def catalog_watch_loop():
+    while True:
+        await asyncio.sleep(CATALOG_POLL_SECONDS)
+        try:
+            if await catalog_version() != CATALOG_VERSION:
+                await load_catalog()
+        except Exception:
+            logging.exception("Catalog reload failed")
+
+def fish_matches(fish: Mapping, rarity: Optional[str], habitat: Optional[str]) -> bool:
+    return (rarity is None or fish['rarity'] == rarity) and (habitat is None or fish['habitat'] == habitat)
+
+def decode_fish_cursor(cursor: Optional[str]) -> Optional[int]:
+    """Cursors are the ordinal of the last fish returned; ordinals are never reused."""
+    if cursor is None:
+        return None
+    try:
+        return int(cursor)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def fish_page_response(catalog: FishCatalog, items: List[Mapping], more: bool) -> Response:
+    # Each fish is already serialized, so a page is spliced rather than encoded
+    next_cursor = str(catalog.ordinals[items[-1]['id']]) if more and items else None
+    body = b''.join([
+        b'{"items":[', b','.join(catalog.fish_bodies[f['id']][0] for f in items),
+        b'],"next_cursor":', json_bytes(next_cursor), b'}'
+    ])
+    return Response(content=body, media_type='application/json')
+
+async def ndjson_stream(catalog: FishCatalog, fish):
+    """Yield one JSON line per fish, NDJSON_BATCH_SIZE lines per chunk."""
+    batch = []
+    for f in fish:
+        batch.append(catalog.fish_bodies[f['id']][0])
+        if len(batch) >= NDJSON_BATCH_SIZE:
+            yield b'\n'.join(batch) + b'\n'
+            batch = []
+            # Let other requests run between chunks of a large stream
+            await asyncio.sleep(0)
+    if batch:
+        yield b'\n'.join(batch) + b'\n'
+
+# ==================== EVENT STREAM ====================
+
+def sse_message(event: str, data) -> bytes:
+    return b'event: ' + event.encode() + b'\ndata: ' + json_bytes(data) + b'\n\n'
+
+class StreamHub:
+    """In-process fan-out of server-sent events.
+
+    Every message is serialized once and the same bytes are queued for all
+    recipients. A subscriber that falls behind loses its oldest messages
+    rather than holding up the others.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        # user_id -> that user's open streams, so a per-user event touches only them
+        self._by_user: Dict[str, set] = {}
+        self._subscribers = 0
+        self.messages = 0
+        self.dropped = 0
+
+    def subscribe(self, user_id: str) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._by_user.setdefault(user_id, set()).add(queue)
+        self._subscribers += 1
+        return queue
+
+    def unsubscribe(self, user_id: str, queue: asyncio.Queue):
+        queues = self._by_user.get(user_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        self._subscribers -= 1
+        if not queues:
+            del self._by_user[user_id]
+
+    def _offer(self, queue: asyncio.Queue, message: bytes):
+        if queue.full():
+            queue.get_nowait()
+            self.dropped += 1
+        queue.put_nowait(message)
+
+    def broadcast(self, event: str, data):
+        message = sse_message(event, data)
+        self.messages += 1
+        for queues in list(self._by_user.values()):
+            for queue in list(queues):
+                self._offer(queue, message)
+
+    def send_to_user(self, user_id: str, event: str, data):
+        queues = self._by_user.get(user_id)
+        if queues:
+            message = sse_message(event, data)
+            self.messages += 1
+            for queue in list(queues):
+                self._offer(queue, message)
+
+    def snapshot(self) -> dict:
+        return {'subscribers': self._subscribers, 'messages': self.messages, 'dropped': self.dropped}
+
+STREAM_HUB = StreamHub(STREAM_QUEUE_SIZE)
+
+# ==================== LEADERBOARD ====================
+
+class MaterializedLeaderboard:
+    """Top-N standings kept in memory with ranks and emails already filled in.
+
+    `open_gacha` pushes point changes through `update`, so serving the board is
+    a plain attribute read. A background refresh from Mongo picks up changes
+    made by other workers.
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.entries: List[dict] = []
+        self._by_user = {}
+        self._body = None
+        self.refreshed_at = None
+
+    @staticmethod
+    def _sort_key(entry: dict):
+        return (-entry['total_points'], -entry['total_fish'], entry['user_id'])
+
+    def _publish(self, entries: List[dict]) -> Optional[dict]:
+        """Swap in new standings and return the delta against the old ones."""
+        # Readers may still hold the previous list, so always build a new one
+        entries = sorted(entries, key=self._sort_key)[:self.size]
+        ranked = [{**entry, 'rank': rank} for rank, entry in enumerate(entries, start=1)]
+        previous = self._by_user
+        self.entries = ranked
+        self._by_user = {entry['user_id']: entry for entry in ranked}
+        self._body = None
+
+        updated = [entry for entry in ranked if previous.get(entry['user_id']) != entry]
+        removed = [user_id for user_id in previous if user_id not in self._by_user]
+        if not updated and not removed:
+            return None
+        return {'snapshot': False, 'updated': updated, 'removed': removed}
+
+    def snapshot(self) -> dict:
+        return {'snapshot': True, 'updated': self.entries, 'removed': []}
+
+    def body(self) -> bytes:
+        """JSON bytes of the current standings, serialized once per change."""
+        if self._body is None:
+            self._body = json_bytes(self.entries)
+        return self._body
+
+    def load(self, rows: List[dict]) -> Optional[dict]:
+        delta = self._publish([
+            {
+                'user_id': row['user_id'],
+                'email': row['email'],
+                'total_points': row.get('total_points', 0),
+                'total_fish': row.get('total_fish', 0)
+            }
+            for row in rows
+        ])
+        self.refreshed_at = datetime.now(timezone.utc)
+        return delta
+
+    def update(self, user_id: str, email: str, total_points: int, total_fish: int) -> Optional[dict]:
+        """Apply a user's new score; returns the delta if the standings changed."""
+        candidate = {
+            'user_id': user_id,
+            'email': email,
+            'total_points': total_points,
+            'total_fish': total_fish
+        }
+        current = self._by_user.get(user_id)
+        if current is None:
+            if len(self.entries) >= self.size and self._sort_key(candidate) >= self._sort_key(self.entries[-1]):
+                return None
+        elif self._sort_key(current) == self._sort_key(candidate):
+            return None
+
+        others = [entry for entry in self.entries if entry['user_id'] != user_id]
+        return self._publish(others + [candidate])
+
+LEADERBOARD = MaterializedLeaderboard(LEADERBOARD_SIZE)
+
+async def refresh_leaderboard():
+    # Stats documents carry the email, so the board needs no join with users
+    pipeline = [
+        {'$sort': {'total_points': -1, 'total_fish': -1, 'user_id': 1}},
+        {'$limit': LEADERBOARD_SIZE},
+        {
+            '$project': {
+                '_id': 0,
+                'user_id': 1,
+                'email': {'$ifNull': ['$email', '']},
+                'total_points': 1,
+                'total_fish': 1
+            }
+        }
+    ]
+    rows = await db.user_stats.aggregate(pipeline).to_list(LEADERBOARD_SIZE)
+    delta = LEADERBOARD.load(rows)
+    if delta:
+        STREAM_HUB.broadcast('leaderboard', delta)
+
+async def leaderboard_refresh_loop():
+    while True:
+        await asyncio.sleep(LEADERBOARD_REFRESH_SECONDS)
+        try:
+            await refresh_leaderboard()
+        except Exception:
+            logging.exception("Leaderboard refresh failed")
+
+def encode_leaderboard_cursor(entry: dict) -> str:
+    position = [entry['total_points'], entry['total_fish'], entry['user_id']]
+    return base64.urlsafe_b64encode(json.dumps(position, separators=(',', ':')).encode()).decode().rstrip('=')
+
+def decode_leaderboard_cursor(cursor: str) -> tuple:
+    """Return `(user_id, total_points, total_fish)` of the row the page continues after."""
+    try:
+        points, fish, user_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if not isinstance(points, int) or not isinstance(fish, int) or not isinstance(user_id, str):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return user_id, points, fish
+
+def leaderboard_after(position: tuple) -> dict:
+    """Filter for rows ranked strictly below `position` in leaderboard order.
+
+    The top-level `$lte` bounds the scan on the leading index key, so a
+    page deep in the board starts where the previous one ended instead of
+    skipping over everything above it.
+    """
+    user_id, points, fish = position
+    return {
+        'total_points': {'$lte': points},
+        '$or': [
+            {'total_points': {'$lt': points}},
+            {'total_fish': {'$lt': fish}},
+            {'total_fish': fish, 'user_id': {'$gt': user_id}}
+        ]
+    }
+
+async def leaderboard_page(after: Optional[tuple], limit: int) -> dict:
+    # One extra row tells whether another page follows
+    pipeline = [
+        {'$match': leaderboard_after(after) if after else {}},
+        {'$sort': {'total_points': -1, 'total_fish': -1, 'user_id': 1}},
+        {'$limit': limit + 1},
+        {
+            '$project': {
+                '_id': 0,
+                'user_id': 1,
+                'email': {'$ifNull': ['$email', '']},
+                'total_points': {'$ifNull': ['$total_points', 0]},
+                'total_fish': {'$ifNull': ['$total_fish', 0]}
+            }
+        }
+    ]
+    rows = await db.user_stats.aggregate(pipeline).to_list(limit + 1)
+    page, more = rows[:limit], len(rows) > limit
+    
+    # Only the page's starting rank comes from the rank index: it learns
+    # other workers' changes late, so per-row ranks could disagree with the
+    # fresh row order. The rows are numbered in the order Mongo returned them,
+    # and teach the index their scores for the pages that follow.
+    for row in page:
+        RANK_INDEX.advance(row['user_id'], row['total_points'], row['total_fish'])
+    if after:
+        user_id, points, fish = after
+        start = RANK_INDEX.count_through(RankIndex.key(user_id, points, fish)) + 1
+    else:
+        start = 1
+    return {
+        'entries': [{'rank': rank, **row} for rank, row in enumerate(page, start=start)],
+        'next_cursor': encode_leaderboard_cursor(page[-1]) if more else None
+    }
+
+# ==================== RANK INDEX ====================
+
+class _RankNode:
+    __slots__ = ('key', 'priority', 'size', 'left', 'right')
+
+    def __init__(self, key: tuple, priority: float):
+        self.key = key
+        self.priority = priority
+        self.size = 1
+        self.left = None
+        self.right = None
+
+def _node_size(node: Optional[_RankNode]) -> int:
+    return node.size if node is not None else 0
+
+def _resize(node: _RankNode):
+    node.size = 1 + _node_size(node.left) + _node_size(node.right)
+
+def _split(node: Optional[_RankNode], key: tuple):
+    """Split a treap into keys below `key` and keys from `key` on."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _resize(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _resize(node)
+    return left, node
+
+def _merge(left: Optional[_RankNode], right: Optional[_RankNode]) -> Optional[_RankNode]:
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _resize(left)
+        return left
+    right.left = _merge(left, right.left)
+    _resize(right)
+    return right
+
+def _remove(node: Optional[_RankNode], key: tuple) -> Optional[_RankNode]:
+    if node is None:
+        return None
+    if key == node.key:
+        return _merge(node.left, node.right)
+    if key < node.key:
+        node.left = _remove(node.left, key)
+    else:
+        node.right = _remove(node.right, key)
+    _resize(node)
+    return node
+
+def build_rank_tree(keys: List[tuple]) -> Optional[_RankNode]:
+    """Build a treap from already sorted, distinct keys in linear time."""
+    stack = []
+    for key in keys:
+        node = _RankNode(key, random.random())
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+            _resize(last)
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    while stack:
+        last = stack.pop()
+        _resize(last)
+    return last if keys else None
+
+class RankIndex:
+    """Every player's exact standing, in an order-statistic treap.
+
+    Keys sort like the leaderboard, `(-total_points, -total_fish, user_id)`,
+    and each node knows its subtree size, so a rank or the players around
+    it cost O(log n) instead of a count over `user_stats`. `open_gacha`
+    applies this worker's changes; a periodic rebuild from Mongo picks up
+    changes made elsewhere.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._keys = {}
+        self._pending = None
+        self.rebuilt_at = None
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    @staticmethod
+    def key(user_id: str, total_points: int, total_fish: int) -> tuple:
+        return (-total_points, -total_fish, user_id)
+
+    def _apply(self, key: tuple):
+        user_id = key[2]
+        current = self._keys.get(user_id)
+        if current == key:
+            return
+        if current is not None:
+            self._root = _remove(self._root, current)
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _RankNode(key, random.random())), right)
+        self._keys[user_id] = key
+
+    def update(self, user_id: str, total_points: int, total_fish: int):
+        key = self.key(user_id, total_points, total_fish)
+        if self._pending is not None:
+            self._pending[user_id] = key
+        self._apply(key)
+
+    def advance(self, user_id: str, total_points: int, total_fish: int):
+        """Apply a score read from Mongo, unless the index already holds a newer one."""
+        current = self._keys.get(user_id)
+        # Scores only grow, so whichever key is further ahead is the newer one
+        if current is None or self.key(user_id, total_points, total_fish) < current:
+            self.update(user_id, total_points, total_fish)
+
+    def count_through(self, key: tuple) -> int:
+        """Number of indexed players at or above `key` in leaderboard order."""
+        node, count = self._root, 0
+        while node is not None:
+            if node.key <= key:
+                count += _node_size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based position of the player, or None if they are not indexed."""
+        key = self._keys.get(user_id)
+        if key is None:
+            return None
+        return self.count_through(key)
+
+    def slice(self, start: int, stop: int) -> List[tuple]:
+        """Keys at 0-based positions [start, stop), skipping unrelated subtrees."""
+        keys = []
+
+        def walk(node, offset):
+            if node is None or offset >= stop or offset + node.size <= start:
+                return
+            walk(node.left, offset)
+            position = offset + _node_size(node.left)
+            if start <= position < stop:
+                keys.append(node.key)
+            walk(node.right, position + 1)
+
+        walk(self._root, 0)
+        return keys
+
+    def around(self, user_id: str, k: int) -> List[dict]:
+        """The player and up to `k` players on either side, with ranks."""
+        rank = self.rank(user_id)
+        if rank is None:
+            return []
+        start = max(0, rank - 1 - k)
+        return [
+            {'rank': position, 'user_id': key[2], 'total_points': -key[0], 'total_fish': -key[1]}
+            for position, key in enumerate(self.slice(start, rank + k), start=start + 1)
+        ]
+
+    def begin_rebuild(self):
+        # Updates made while Mongo is being read are replayed afterwards
+        self._pending = {}
+
+    def finish_rebuild(self, keys: List[tuple], root: Optional[_RankNode]):
+        pending, self._pending = self._pending or {}, None
+        self._root = root
+        self._keys = {key[2]: key for key in keys}
+        for user_id, key in pending.items():
+            current = self._keys.get(user_id)
+            # Scores only grow, so whichever side is ahead is the newer one
+            if current is None or key < current:
+                self._apply(key)
+        self.rebuilt_at = datetime.now(timezone.utc)
+
+    def abort_rebuild(self):
+        self._pending = None
+
+RANK_INDEX = RankIndex()
+
+async def rebuild_rank_index():
+    RANK_INDEX.begin_rebuild()
+    try:
+        cursor = db.user_stats.find(
+            {}, {'_id': 0, 'user_id': 1, 'total_points': 1, 'total_fish': 1}
+        ).sort([('total_points', DESCENDING), ('total_fish', DESCENDING), ('user_id', ASCENDING)])
+        keys = [
+            RankIndex.key(row['user_id'], row.get('total_points') or 0, row.get('total_fish') or 0)
+            async for row in cursor
+        ]
+        # Already in index order except for docs missing totals; timsort keeps this linear
+        keys.sort()
+        root = await asyncio.get_running_loop().run_in_executor(None, build_rank_tree, keys)
+    except BaseException:
+        RANK_INDEX.abort_rebuild()
+        raise
+    RANK_INDEX.finish_rebuild(keys, root)
+    logging.info(f"Rank index rebuilt with {len(keys)} players")
+
+async def rank_rebuild_loop():
+    while True:
+        await asyncio.sleep(RANK_REBUILD_SECONDS)
+        try:
+            await rebuild_rank_index()
+        except Exception:
+            logging.exception("Rank index rebuild failed")
+
+# ==================== WINDOWED LEADERBOARDS ====================
+
+SCORE_WINDOWS = ('day', 'week')
+
+def window_period(window: str, now: datetime) -> tuple:
+    """Return the UTC period key for `now` and when its bucket may be deleted.
+
+    Buckets outlive their period by one more period, so "yesterday" and
+    "last week" can still be read around the boundary.
+    """
+    today = now.date()
+    if window == 'day':
+        period, start, length = today.isoformat(), today, timedelta(days=1)
+    else:
+        year, week, weekday = today.isocalendar()
+        period, start, length = f"{year}-W{week:02d}", today - timedelta(days=weekday - 1), timedelta(weeks=1)
+    expires_at = datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc) + 2 * length
+    return period, expires_at
+
+def score_bucket_upserts(user_id: str, email: str, points: int, fish: int, now: datetime) -> List[dict]:
+    """One `$inc` upsert per window, shaped as WriteBehindQueue.upsert arguments."""
+    upserts = []
+    for window in SCORE_WINDOWS:
+        period, expires_at = window_period(window, now)
+        upserts.append({
+            'filter_doc': {'window': window, 'period': period, 'user_id': user_id},
+            'inc': {'points': points, 'fish': fish},
+            'set_fields': {'email': email},
+            'set_on_insert': {'expires_at': expires_at}
+        })
+    return upserts
+
+def score_bucket_request(upsert: dict) -> UpdateOne:
+    return UpdateOne(
+        upsert['filter_doc'],
+        {'$inc': upsert['inc'], '$set': upsert['set_fields'], '$setOnInsert': upsert['set_on_insert']},
+        upsert=True
+    )
+
+WINDOW_BOARDS = {}
+
+async def window_leaderboard(window: str) -> dict:
+    """Top-N for the current period of `window`, cached for a few seconds per worker."""
+    now = datetime.now(timezone.utc)
+    period, _ = window_period(window, now)
+    board = WINDOW_BOARDS.get(window)
+    if board and board['period'] == period and time.monotonic() < board['expires']:
+        return board
+    
+    rows = await db.score_buckets.find(
+        {'window': window, 'period': period},
+        {'_id': 0, 'user_id': 1, 'email': 1, 'points': 1, 'fish': 1}
+    ).sort([('points', DESCENDING), ('fish', DESCENDING), ('user_id', ASCENDING)]).to_list(LEADERBOARD_SIZE)
+    entries = [
+        {
+            'rank': rank,
+            'user_id': row['user_id'],
+            'email': row.get('email', ''),
+            'total_points': row.get('points', 0),
+            'total_fish': row.get('fish', 0)
+        }
+        for rank, row in enumerate(rows, start=1)
+    ]
+    board = {
+        'period': period,
+        'expires': time.monotonic() + WINDOW_LEADERBOARD_TTL_SECONDS,
+        'entries': entries,
+        'body': json_bytes(entries)
+    }
+    WINDOW_BOARDS[window] = board
+    return board
+
+# ==================== WRITE-BEHIND ====================
+
+WRITE_BEHIND_BATCH = Histogram(
+    'write_behind_batch_size', 'Operations per write-behind bulk_write.', ('collection',),
+    buckets=(1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+)
+WRITE_BEHIND_LAG = Histogram(
+    'write_behind_lag_seconds', 'Age of the oldest buffered operation when its batch was written.'
+)
+WRITE_BEHIND_FAILED = Counter(
+    'write_behind_failed_operations_total', 'Buffered operations dropped after their retry failed too.', ('collection',)
+)
+
+def _freeze(filter_doc: dict) -> tuple:
+    return tuple(sorted(filter_doc.items()))
+
+class WriteBehindQueue:
+    """Buffers writes and applies them in periodic unordered bulk_writes.
+
+    Upserts with the same filter are coalesced: `$inc` amounts are summed,
+    `$set` keeps the latest value and `$setOnInsert` the earliest. Callers
+    only enqueue writes whose outcome no request depends on. When
+    `max_pending` operations are buffered, the next caller waits for a
+    flush instead of growing the buffer. Operations from a failed flush
+    are re-queued once, then dropped.
+    """
+
+    def __init__(self, flush_seconds: float, batch_size: int, max_pending: int):
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self._ops = {}
+        self._oldest = None
+        self._inserts = 0
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self._stopping = False
+        self.flushed = 0
+        self.retried = 0
+
+    @property
+    def pending(self) -> int:
+        return len(self._ops)
+
+    async def _reserve(self):
+        if len(self._ops) >= self.max_pending:
+            await self.flush()
+
+    def _added(self):
+        if self._oldest is None:
+            self._oldest = time.monotonic()
+        if len(self._ops) >= self.batch_size:
+            self._wakeup.set()
+
+    async def upsert(self, collection: str, filter_doc: dict, inc: Optional[dict] = None,
+                     set_fields: Optional[dict] = None, set_on_insert: Optional[dict] = None):
+        await self._reserve()
+        key = (collection, _freeze(filter_doc))
+        op = self._ops.get(key)
+        if op is None:
+            op = self._ops[key] = {'filter': filter_doc, 'inc': {}, 'set': {}, 'set_on_insert': {}}
+        for field, amount in (inc or {}).items():
+            op['inc'][field] = op['inc'].get(field, 0) + amount
+        op['set'].update(set_fields or {})
+        for field, value in (set_on_insert or {}).items():
+            op['set_on_insert'].setdefault(field, value)
+        self._added()
+
+    async def insert(self, collection: str, document: dict):
+        await self._reserve()
+        self._inserts += 1
+        self._ops[(collection, ('insert', self._inserts))] = {'document': document}
+        self._added()
+
+    def _requeue(self, key: tuple, op: dict):
+        """Put a failed operation back, merging it under anything enqueued since."""
+        newer = self._ops.get(key)
+        if newer is not None:
+            # The failed op is the older one: `$set` yields to the newer
+            # value and `$setOnInsert` keeps the older one
+            for field, amount in op['inc'].items():
+                newer['inc'][field] = newer['inc'].get(field, 0) + amount
+            newer['set'] = {**op['set'], **newer['set']}
+            newer['set_on_insert'] = {**newer['set_on_insert'], **op['set_on_insert']}
+        else:
+            self._ops[key] = dict(op, retried=True)
+        self._added()
+
+    @staticmethod
+    def _request(op: dict):
+        if 'document' in op:
+            return InsertOne(op['document'])
+        update = {}
+        for operator, field in (('$inc', 'inc'), ('$set', 'set'), ('$setOnInsert', 'set_on_insert')):
+            if op[field]:
+                update[operator] = op[field]
+        return UpdateOne(op['filter'], update, upsert=True)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._ops:
+                return
+            ops, self._ops = self._ops, {}
+            oldest, self._oldest = self._oldest, None
+
+            batches = defaultdict(list)
+            for key, op in ops.items():
+                batches[key[0]].append((key, op))
+            for collection, batch in batches.items():
+                WRITE_BEHIND_BATCH.observe((collection,), len(batch))
+                try:
+                    await db[collection].bulk_write([self._request(op) for _, op in batch], ordered=False)
+                    self.flushed += len(batch)
+                    continue
+                except BulkWriteError as e:
+                    # Unordered: everything not listed in writeErrors was applied
+                    failed_indexes = {error['index'] for error in e.details.get('writeErrors', [])}
+                    failed = [batch[index] for index in sorted(failed_indexes)]
+                    self.flushed += len(batch) - len(failed)
+                    logging.exception(f"Write-behind flush to {collection} failed for {len(failed)} operations")
+                except Exception:
+                    # Nothing says which writes were applied; retrying all
+                    # of them risks a double `$inc` over losing them
+                    failed = batch
+                    logging.exception(f"Write-behind flush to {collection} failed")
+                retry = [(key, op) for key, op in failed if not op.get('retried')]
+                for key, op in retry:
+                    self._requeue(key, op)
+                self.retried += len(retry)
+                if len(failed) > len(retry):
+                    WRITE_BEHIND_FAILED.inc((collection,), len(failed) - len(retry))
+            WRITE_BEHIND_LAG.observe((), time.monotonic() - oldest)
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Write-behind flush failed")
+
+    def start(self):
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the flush loop and write out everything still buffered.
+
+        The loop is never cancelled: a flush has already taken its batch out
+        of the buffer, so cancelling it mid-write would lose the batch.
+        """
+        self._stopping = True
+        self._wakeup.set()
+        if self._task:
+            await self._task
+            self._task = None
+        # A second pass gives operations re-queued by the last flush their retry
+        for _ in range(2):
+            await self.flush()
+        if self._ops:
+            for collection, _ in self._ops:
+                WRITE_BEHIND_FAILED.inc((collection,))
+            logging.error(f"Write-behind dropped {len(self._ops)} operations at shutdown")
+            self._ops = {}
+
+    def snapshot(self) -> dict:
+        return {
+            'enabled': WRITE_BEHIND_ENABLED,
+            'pending': self.pending,
+            'flushed': self.flushed,
+            'retried': self.retried
+        }
+
+WRITE_BEHIND = WriteBehindQueue(WRITE_BEHIND_FLUSH_SECONDS, WRITE_BEHIND_BATCH_SIZE, WRITE_BEHIND_MAX_PENDING)
+
+# ==================== PULL LOG ====================
+
+async def ensure_pull_log():
+    """Create pull_log as a time-series collection, or a capped one where unsupported."""
+    if 'pull_log' in await db.list_collection_names():
+        return
+    options = (
+        ('time-series', {
+            'timeseries': {'timeField': 'ts', 'metaField': 'user_id', 'granularity': 'seconds'},
+            'expireAfterSeconds': PULL_LOG_RETENTION_DAYS * 86400
+        }),
+        ('capped', {'capped': True, 'size': PULL_LOG_CAPPED_MB * 1024 * 1024})
+    )
+    for kind, kwargs in options:
+        try:
+            await db.create_collection('pull_log', **kwargs)
+        except CollectionInvalid:
+            # Another worker created it first
+            return
+        except (OperationFailure, NotImplementedError) as e:
+            logging.warning(f"pull_log cannot be a {kind} collection: {e}")
+            continue
+        logging.info(f"Created pull_log as a {kind} collection")
+        return
+    logging.warning("pull_log will be a regular collection")
+
+def rollup_hour(now: datetime) -> datetime:
+    return now.replace(minute=0, second=0, microsecond=0)
+
+async def log_pulls(user_id: str, pulls: List[GachaPull]):
+    """Append the pulls to pull_log and count them into the hour's rollup.
+
+    Both go through the write-behind queue, which is always running, so a
+    flush writes every buffered pull in one unordered insert and folds all
+    of an hour's counts into a single `$inc`.
+    """
+    now = datetime.now(timezone.utc)
+    counts = defaultdict(int)
+    for pull in pulls:
+        await WRITE_BEHIND.insert('pull_log', {
+            'ts': now,
+            'user_id': user_id,
+            'fish_id': pull.fish.id,
+            'rarity': pull.fish.rarity,
+            'is_new': pull.is_new
+        })
+        counts['total'] += 1
+        counts[f"rarity.{pull.fish.rarity}"] += 1
+        counts[f"fish.{pull.fish.id}"] += 1
+    await WRITE_BEHIND.upsert('pull_rollups', {'hour': rollup_hour(now)}, inc=dict(counts))
+
+def rate_row(observed: int, total: int, expected: float) -> dict:
+    low, high = wilson_interval(observed, total)
+    return {
+        'expected': round(expected, 6),
+        'observed': round(observed / total, 6) if total else None,
+        'hits': observed,
+        'ci95_low': round(low, 6),
+        'ci95_high': round(high, 6),
+        'within_ci': low <= expected <= high if total else None
+    }
+
+async def drop_rate_report(days: int) -> dict:
+    """Observed vs expected drop rates over the last `days` days, from hourly rollups only."""
+    since = rollup_hour(datetime.now(timezone.utc) - timedelta(days=days))
+    total, by_rarity, by_fish = 0, defaultdict(int), defaultdict(int)
+    async for rollup in db.pull_rollups.find({'hour': {'$gte': since}}, {'_id': 0}):
+        total += rollup.get('total', 0)
+        for rarity, count in rollup.get('rarity', {}).items():
+            by_rarity[rarity] += count
+        for fish_id, count in rollup.get('fish', {}).items():
+            by_fish[fish_id] += count
+    
+    # Expected rates come from the live sampler; a weight change inside the
+    # window shows up as a deviation
+    sampler = GACHA_SAMPLER
+    expected_rarity = defaultdict(float)
+    for fish, probability in zip(sampler.items, sampler.probabilities):
+        expected_rarity[fish['rarity']] += probability
+    return {
+        'days': days,
+        'since': since.isoformat(),
+        'pulls': total,
+        'rarities': [
+            {'rarity': rarity, **rate_row(by_rarity.get(rarity, 0), total, expected)}
+            for rarity, expected in sorted(expected_rarity.items(), key=lambda item: -item[1])
+        ],
+        'species': [
+            {'id': fish['id'], 'rarity': fish['rarity'], **rate_row(by_fish.get(fish['id'], 0), total, probability)}
+            for fish, probability in zip(sampler.items, sampler.probabilities)
+        ]
+    }
+
+# ==================== OWNERSHIP BITSET ====================
+
+# Each user's owned species live on the stats document as `owned_bits`, a
+# map of 32-bit words ('w0', 'w1', ...) indexed by catalog ordinal. Words
+# stay well inside double precision, so the pull pipeline can test and set
+# bits with plain arithmetic operators.
+OWNED_WORD_BITS = 32
+
+def owned_bit(ordinal: int):
+    return f"w{ordinal // OWNED_WORD_BITS}", 1 << (ordinal % OWNED_WORD_BITS)
+
+def owned_bits_from_ordinals(ordinals) -> dict:
+    words = {}
+    for ordinal in ordinals:
+        word, mask = owned_bit(ordinal)
+        words[word] = words.get(word, 0) | mask
+    return words
+
+def owned_ordinals(owned_bits: Optional[dict]) -> List[int]:
+    ordinals = []
+    for word, value in (owned_bits or {}).items():
+        base = int(word[1:]) * OWNED_WORD_BITS
+        value = int(value)
+        while value:
+            low = value & -value
+            ordinals.append(base + low.bit_length() - 1)
+            value ^= low
+    return sorted(ordinals)
+
+async def backfill_owned_bits():
+    """Build `owned_bits` from user_fish for stats documents created before it existed."""
+    migrated = 0
+    async for stats in db.user_stats.find({'owned_bits': {'$exists': False}}, {'_id': 0, 'user_id': 1}):
+        unlocks = await db.user_fish.find({'user_id': stats['user_id']}, {'_id': 0, 'fish_id': 1}).to_list(None)
+        ordinals = [CATALOG.ordinals[u['fish_id']] for u in unlocks if u['fish_id'] in CATALOG.ordinals]
+        await db.user_stats.update_one(
+            {'user_id': stats['user_id'], 'owned_bits': {'$exists': False}},
+            {
+                '$set': {'owned_bits': owned_bits_from_ordinals(ordinals), 'total_fish': len(ordinals)},
+                '$inc': {'version': 1}
+            }
+        )
+        STATS_CACHE.evict(stats['user_id'])
+        migrated += 1
+    if migrated:
+        logging.info(f"Backfilled ownership bits for {migrated} users")
+
+async def backfill_stats_email():
+    """Copy `email` from users onto stats documents created before it was stored there."""
+    migrated = 0
+    async for stats in db.user_stats.find({'email': {'$exists': False}}, {'_id': 0, 'user_id': 1}):
+        user = await db.users.find_one({'id': stats['user_id']}, {'_id': 0, 'email': 1})
+        if not user:
+            continue
+        await db.user_stats.update_one(
+            {'user_id': stats['user_id'], 'email': {'$exists': False}},
+            {'$set': {'email': user['email']}, '$inc': {'version': 1}}
+        )
+        STATS_CACHE.evict(stats['user_id'])
+        migrated += 1
+    if migrated:
+        logging.info(f"Backfilled email for {migrated} users")
+
+def unlock_pipeline(fish_list: List[dict]) -> List[dict]:
+    """Update stages that set ownership bits and award points for new species.
+
+    Must run after the case-consumption stages: nothing changes unless
+    `case_granted` is true. The final stage drops every scratch field, so
+    nothing per-request is stored; `pull_outcome` recovers the results.
+    """
+    stages = []
+    for index, fish in enumerate(fish_list):
+        word, mask = owned_bit(CATALOG.ordinals[fish['id']])
+        current = {'$ifNull': [f'$owned_bits.{word}', 0]}
+        is_set = {'$mod': [{'$floor': {'$divide': [current, mask]}}, 2]}
+        stages.append({'$set': {f'_new{index}': {'$and': ['$case_granted', {'$eq': [is_set, 0]}]}}})
+        stages.append({'$set': {
+            f'owned_bits.{word}': {'$cond': [f'$_new{index}', {'$add': [current, mask]}, current]}
+        }})
+
+    flags = [f'$_new{index}' for index in range(len(fish_list))]
+    stages.append({'$set': {
+        'total_points': {'$add': ['$total_points'] + [
+            {'$cond': [flag, fish['points'], 0]} for flag, fish in zip(flags, fish_list)
+        ]},
+        'total_fish': {'$add': ['$total_fish'] + [{'$cond': [flag, 1, 0]} for flag in flags]}
+    }})
+    # `pull_new_ids` is only dropped to clean up documents from before it stopped being stored
+    scratch = ['case_granted', 'pull_new_ids'] + [f'_new{index}' for index in range(len(fish_list))]
+    stages.append({'$project': {field: 0 for field in scratch}})
+    return stages
+
+# ==================== GACHA PULLS ====================
+
+def gacha_status_from_stats(stats: Optional[dict]) -> GachaStatus:
+    if not stats:
+        return GachaStatus(cases_remaining=GACHA_DAILY_CASES, next_reset=None)
     
     today = datetime.now(timezone.utc).date().isoformat()
     last_date = stats.get('last_case_date')
     
     if last_date != today:
-        return GachaStatus(cases_remaining=1, next_reset=None)
+        return GachaStatus(cases_remaining=GACHA_DAILY_CASES, next_reset=None)
     
     cases_used = stats.get('daily_cases_used', 0)
-    remaining = max(0, 1 - cases_used)
+    remaining = max(0, GACHA_DAILY_CASES - cases_used)
     
     tomorrow = datetime.now(timezone.utc).date() + timedelta(days=1)
     next_reset = datetime.combine(tomorrow, datetime.min.time()).isoformat()
     
     return GachaStatus(cases_remaining=remaining, next_reset=next_reset)
 
-@api_router.post("/gacha/open", response_model=GachaResult)
-async def open_gacha(user: dict = Depends(verify_token)):
-    user_id = user['user_id']
-    stats = await db.user_stats.find_one({'user_id': user_id}, {'_id': 0})
-    
-    if not stats:
-        stats = {
-            'user_id': user_id,
-            'total_points': 0,
-            'total_fish': 0,
-            'daily_cases_used': 0,
-            'last_case_date': None
-        }
-        await db.user_stats.insert_one(stats)
+def stats_event(stats: Optional[dict]) -> dict:
+    return {
+        'total_points': stats.get('total_points', 0) if stats else 0,
+        'total_fish': stats.get('total_fish', 0) if stats else 0,
+        **gacha_status_from_stats(stats).model_dump()
+    }
+
+def consume_cases_pipeline(today: str, count: int, email: str) -> List[dict]:
+    """Update pipeline that spends `count` cases only if today's quota allows it.
+
+    Runs as a single atomic find_one_and_update, so concurrent pulls cannot
+    both spend the last case. `case_granted` only lives for the duration of
+    the update; `version` changes only when the cases were consumed.
+    """
+    used_today = {
+        '$cond': [
+            {'$eq': ['$last_case_date', today]},
+            {'$ifNull': ['$daily_cases_used', 0]},
+            0
+        ]
+    }
+    return [
+        {'$set': {'case_granted': {'$lte': [{'$add': [used_today, count]}, GACHA_DAILY_CASES]}}},
+        {'$set': {
+            'daily_cases_used': {
+                '$cond': ['$case_granted', {'$add': [used_today, count]}, {'$ifNull': ['$daily_cases_used', 0]}]
+            },
+            'last_case_date': {
+                '$cond': ['$case_granted', today, {'$ifNull': ['$last_case_date', None]}]
+            },
+            'email': {'$ifNull': ['$email', {'$literal': email}]},
+            'version': {
+                '$cond': ['$case_granted', {'$add': [{'$ifNull': ['$version', 0]}, 1]}, {'$ifNull': ['$version', 0]}]
+            },
+            'total_points': {'$ifNull': ['$total_points', 0]},
+            'total_fish': {'$ifNull': ['$total_fish', 0]},
+            'owned_bits': {'$ifNull': ['$owned_bits', {}]}
+        }}
+    ]
+
+def pull_outcome(before: Optional[dict], user_id: str, email: str, today: str, count: int,
+                 fish_list: List[dict]):
+    """Replay the pull pipelines on the document they ran against.
+
+    Returns `(granted, new_ids, stats)`, with `stats` equal to the stored
+    result. The update is atomic, so the pre-update document determines
+    its outcome exactly. Must stay in step with `consume_cases_pipeline`
+    and `unlock_pipeline`.
+    """
+    stats = dict(before) if before else {'user_id': user_id}
+    for field, default in (('email', email), ('total_points', 0), ('total_fish', 0), ('version', 0),
+                           ('daily_cases_used', 0)):
+        if stats.get(field) is None:
+            stats[field] = default
+    stats.setdefault('last_case_date', None)
+    stats['owned_bits'] = dict(stats.get('owned_bits') or {})
     
+    used_today = stats['daily_cases_used'] if stats['last_case_date'] == today else 0
+    granted = used_today + count <= GACHA_DAILY_CASES
+    new_ids = []
+    if granted:
+        stats['daily_cases_used'] = used_today + count
+        stats['last_case_date'] = today
+        stats['version'] += 1
+        for fish in fish_list:
+            word, mask = owned_bit(CATALOG.ordinals[fish['id']])
+            current = int(stats['owned_bits'].get(word, 0))
+            if (current // mask) % 2 == 0:
+                stats['owned_bits'][word] = current + mask
+                stats['total_points'] += fish['points']
+                stats['total_fish'] += 1
+                new_ids.append(fish['id'])
+    for field in ('case_granted', 'pull_new_ids'):
+        stats.pop(field, None)
+    return granted, new_ids, stats
+
+async def perform_pulls(user: dict, count: int):
+    """Spend `count` cases and unlock the drawn fish.
+
+    The fish are drawn first; one pipeline update then consumes the quota,
+    sets ownership bits and awards points for new species. The only other
+    round trip records unlock history for species that were new.
+    """
+    user_id = user['user_id']
     today = datetime.now(timezone.utc).date().isoformat()
-    last_date = stats.get('last_case_date')
-    
-    if last_date == today and stats.get('daily_cases_used', 0) >= 1:
-        raise HTTPException(status_code=400, detail="No cases remaining today")
     
-    fish_data = get_random_fish_by_rarity()
-    fish = Fish(**fish_data)
+    drawn = [GACHA_SAMPLER.draw()] if count == 1 else GACHA_SAMPLER.draw_many(count)
+    distinct = list({fish['id']: fish for fish in drawn}.values())
     
-    existing_unlock = await db.user_fish.find_one({
-        'user_id': user_id,
-        'fish_id': fish.id
-    }, {'_id': 0})
-    
-    is_new = existing_unlock is None
+    before = await db.user_stats.find_one_and_update(
+        {'user_id': user_id},
+        consume_cases_pipeline(today, count, user['email']) + unlock_pipeline(distinct),
+        projection={'_id': 0},
+        upsert=True,
+        return_document=ReturnDocument.BEFORE
+    )
+    granted, new_ids, stats = pull_outcome(before, user_id, user['email'], today, count, distinct)
+    STATS_CACHE.put(user_id, stats)
+    if not granted:
+        detail = "No cases remaining today" if count == 1 else "Not enough cases remaining today"
+        raise HTTPException(status_code=400, detail=detail)
     
-    if is_new:
-        unlock_doc = {
-            'user_id': user_id,
-            'fish_id': fish.id,
-            'unlocked_at': datetime.now(timezone.utc).isoformat()
-        }
-        await db.user_fish.insert_one(unlock_doc)
-        
-        new_points = stats.get('total_points', 0) + fish.points
-        new_total = stats.get('total_fish', 0) + 1
-        
-        await db.user_stats.update_one(
-            {'user_id': user_id},
-            {'$set': {
-                'total_points': new_points,
-                'total_fish': new_total,
-                'daily_cases_used': 1 if last_date != today else stats.get('daily_cases_used', 0) + 1,
-                'last_case_date': today
-            }}
+    if new_ids:
+        now = datetime.now(timezone.utc)
+        unlocked_at = now.isoformat()
+        drawn_by_id = {fish['id']: fish for fish in distinct}
+        buckets = score_bucket_upserts(
+            user_id, user['email'], sum(drawn_by_id[fish_id]['points'] for fish_id in new_ids), len(new_ids), now
         )
-    else:
-        if last_date != today:
-            await db.user_stats.update_one(
-                {'user_id': user_id},
-                {'$set': {
-                    'daily_cases_used': 1,
-                    'last_case_date': today
-                }}
-            )
+        if WRITE_BEHIND_ENABLED:
+            # Quota, ownership and points are already durable; unlock
+            # history and the windowed scores are deferred
+            for fish_id in new_ids:
+                await WRITE_BEHIND.upsert(
+                    'user_fish', {'user_id': user_id, 'fish_id': fish_id}, set_on_insert={'unlocked_at': unlocked_at}
+                )
+            for bucket in buckets:
+                await WRITE_BEHIND.upsert('score_buckets', **bucket)
         else:
-            await db.user_stats.update_one(
-                {'user_id': user_id},
-                {'$inc': {'daily_cases_used': 1}}
+            await asyncio.gather(
+                db.user_fish.bulk_write(
+                    [
+                        UpdateOne(
+                            {'user_id': user_id, 'fish_id': fish_id},
+                            {'$setOnInsert': {'unlocked_at': unlocked_at}},
+                            upsert=True
+                        )
+                        for fish_id in new_ids
+                    ],
+                    ordered=False
+                ),
+                db.score_buckets.bulk_write([score_bucket_request(bucket) for bucket in buckets], ordered=False)
             )
+        RANK_INDEX.update(user_id, stats['total_points'], stats['total_fish'])
+        delta = LEADERBOARD.update(user_id, user['email'], stats['total_points'], stats['total_fish'])
+        if delta:
+            STREAM_HUB.broadcast('leaderboard', delta)
+    STREAM_HUB.send_to_user(user_id, 'stats', stats_event(stats))
     
-    updated_stats = await db.user_stats.find_one({'user_id': user_id}, {'_id': 0})
+    pulls = []
+    pending_new = set(new_ids)
+    for fish_data in drawn:
+        # A species drawn twice in one batch is only new the first time
+        is_new = fish_data['id'] in pending_new
+        pending_new.discard(fish_data['id'])
+        pulls.append(GachaPull(fish=Fish(**fish_data), is_new=is_new))
+    if PULL_LOG_ENABLED:
+        await log_pulls(user_id, pulls)
     
+    return pulls, stats
+
+# ==================== AUTH ENDPOINTS ====================
+
+@api_router.post(
+    "/auth/register", response_model=Token, dependencies=[Depends(limit_auth_ip), Depends(route_slot('auth'))]
+)
+async def register(user_data: UserRegister):
+    await enforce_rate_limit('auth_email', user_data.email.lower())
+    # Only saves the bcrypt work; the unique index decides concurrent registrations
+    existing = await db.users.find_one({'email': user_data.email}, {'_id': 1})
+    if existing:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    user_id = str(uuid.uuid4())
+    password_hash = await AUTH_POOL.hash(user_data.password)
+    
+    user_doc = {
+        'id': user_id,
+        'email': user_data.email,
+        'password_hash': password_hash,
+        'created_at': datetime.now(timezone.utc).isoformat()
+    }
+    
+    try:
+        await db.users.insert_one(user_doc)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=400, detail="Email already registered")
+    
+    stats_doc = {
+        'user_id': user_id,
+        'email': user_data.email,
+        'total_points': 0,
+        'total_fish': 0,
+        'owned_bits': {},
+        'daily_cases_used': 0,
+        'last_case_date': None,
+        'version': 0
+    }
+    await db.user_stats.insert_one(stats_doc)
+    stats_doc.pop('_id', None)
+    STATS_CACHE.put(user_id, stats_doc)
+    RANK_INDEX.update(user_id, 0, 0)
+    
+    token = create_token(user_id, user_data.email)
+    return Token(token=token, user_id=user_id, email=user_data.email)
+
+@api_router.post(
+    "/auth/login", response_model=Token, dependencies=[Depends(limit_auth_ip), Depends(route_slot('auth'))]
+)
+async def login(user_data: UserLogin):
+    await enforce_rate_limit('auth_email', user_data.email.lower())
+    user = await db.users.find_one({'email': user_data.email}, {'_id': 0})
+    if not user or not await AUTH_POOL.verify(user_data.password, user['password_hash']):
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+    
+    token = create_token(user['id'], user['email'])
+    return Token(token=token, user_id=user['id'], email=user['email'])
+
+# ==================== FISH ENDPOINTS ====================
+
+@api_router.get("/fish/aquarium", response_model=List[AquariumFish])
+async def get_aquarium(request: Request, user: dict = Depends(verify_token)):
+    aquarium = get_aquarium_fish()
+    expires_in = (aquarium['epoch'] + 1) * AQUARIUM_EPOCH_SECONDS - int(time.time())
+    return etag_response(
+        request,
+        aquarium['body'],
+        aquarium['etag'],
+        cache_control=f"private, max-age={max(expires_in, 0)}"
+    )
+
+@api_router.get("/fish/all", response_model=List[Fish])
+async def get_all_fish(request: Request, user: dict = Depends(verify_token)):
+    return etag_response(request, CATALOG.list_body, CATALOG.list_etag)
+
+@api_router.get("/fish/page", response_model=FishPage)
+async def get_fish_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=FISH_PAGE_MAX),
+    rarity: Optional[str] = None,
+    habitat: Optional[str] = None,
+    user: dict = Depends(verify_token)
+):
+    after = decode_fish_cursor(cursor)
+    catalog = CATALOG
+    fish = catalog.select(rarity, habitat)
+    start = 0
+    if after is not None:
+        start = bisect.bisect_right(fish, after, key=lambda f: catalog.ordinals[f['id']])
+    return fish_page_response(catalog, fish[start:start + limit], start + limit < len(fish))
+
+@api_router.get("/fish/stream")
+async def stream_fish(rarity: Optional[str] = None, habitat: Optional[str] = None, user: dict = Depends(verify_token)):
+    catalog = CATALOG
+    return StreamingResponse(ndjson_stream(catalog, catalog.select(rarity, habitat)), media_type='application/x-ndjson')
+
+@api_router.get("/fish/{fish_id}", response_model=Fish)
+async def get_fish_detail(fish_id: str, request: Request, user: dict = Depends(verify_token)):
+    cached = CATALOG.fish_bodies.get(fish_id)
+    if not cached:
+        raise HTTPException(status_code=404, detail="Fish not found")
+    return etag_response(request, *cached)
+
+# ==================== GACHA ENDPOINTS ====================
+
+@api_router.get("/gacha/status", response_model=GachaStatus)
+async def get_gacha_status(user: dict = Depends(verify_token)):
+    stats = await get_stats_doc(user['user_id'])
+    return trusted_response(gacha_status_from_stats(stats).model_dump())
+
+@api_router.post(
+    "/gacha/open", response_model=GachaResult, dependencies=[Depends(limit_gacha_user), Depends(route_slot('gacha'))]
+)
+async def open_gacha(user: dict = Depends(verify_token)):
+    pulls, stats = await perform_pulls(user, 1)
     return GachaResult(
-        fish=fish,
-        is_new=is_new,
-        total_points=updated_stats.get('total_points', 0)
+        fish=pulls[0].fish,
+        is_new=pulls[0].is_new,
+        total_points=stats['total_points'],
+        cases_remaining=gacha_status_from_stats(stats).cases_remaining
+    )
+
+@api_router.post(
+    "/gacha/open-multi",
+    response_model=MultiGachaResult,
+    dependencies=[Depends(limit_gacha_user), Depends(route_slot('gacha'))]
+)
+async def open_gacha_multi(request: MultiPullRequest, user: dict = Depends(verify_token)):
+    pulls, stats = await perform_pulls(user, request.count)
+    return MultiGachaResult(
+        pulls=pulls,
+        total_points=stats['total_points'],
+        cases_remaining=gacha_status_from_stats(stats).cases_remaining
     )
 
 @api_router.post("/gacha/reset")
 async def reset_gacha(user: dict = Depends(verify_token)):
-    await db.user_stats.update_one(
+    stats = await db.user_stats.find_one_and_update(
         {'user_id': user['user_id']},
-        {'$set': {'daily_cases_used': 0}}
+        {'$set': {'daily_cases_used': 0}, '$inc': {'version': 1}},
+        projection={'_id': 0},
+        return_document=ReturnDocument.AFTER
     )
+    STATS_CACHE.put(user['user_id'], stats)
+    STREAM_HUB.send_to_user(user['user_id'], 'stats', stats_event(stats))
     return {'message': 'Cases reset successfully'}
 
 # ==================== LEADERBOARD ENDPOINTS ====================
 
 @api_router.get("/leaderboard", response_model=List[LeaderboardEntry])
-async def get_leaderboard(user: dict = Depends(verify_token)):
-    pipeline = [
-        {
-            '$lookup': {
-                'from': 'users',
-                'localField': 'user_id',
-                'foreignField': 'id',
-                'as': 'user_info'
-            }
-        },
-        {'$unwind': '$user_info'},
-        {
-            '$project': {
-                '_id': 0,
-                'user_id': 1,
-                'email': '$user_info.email',
-                'total_points': 1,
-                'total_fish': 1
-            }
-        },
-        {'$sort': {'total_points': -1, 'total_fish': -1}},
-        {'$limit': 20}
-    ]
-    
-    leaderboard = await db.user_stats.aggregate(pipeline).to_list(20)
-    return leaderboard
+async def get_leaderboard(
+    window: Optional[str] = Query(None, pattern='^(day|week)$'),
+    user: dict = Depends(verify_token)
+):
+    if window:
+        board = await window_leaderboard(window)
+        if FAST_RESPONSES:
+            return Response(content=board['body'], media_type='application/json')
+        return board['entries']
+    if FAST_RESPONSES:
+        return Response(content=LEADERBOARD.body(), media_type='application/json')
+    return LEADERBOARD.entries
+
+@api_router.get("/leaderboard/page", response_model=LeaderboardPage)
+async def get_leaderboard_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=LEADERBOARD_PAGE_MAX),
+    user: dict = Depends(verify_token)
+):
+    after = decode_leaderboard_cursor(cursor) if cursor else None
+    return trusted_response(await leaderboard_page(after, limit))
+
+@api_router.get("/leaderboard/me", response_model=PlayerStanding)
+async def get_my_standing(
+    k: int = Query(5, ge=0, le=LEADERBOARD_MAX_NEIGHBORS),
+    user: dict = Depends(verify_token)
+):
+    user_id = user['user_id']
+    stats = await get_stats_doc(user_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="Stats not found")
+    # The caller may have registered or pulled through another worker since
+    # the last rebuild; their own standing should never lag behind that
+    RANK_INDEX.advance(user_id, stats.get('total_points', 0), stats.get('total_fish', 0))
+
+    rank = RANK_INDEX.rank(user_id)
+    neighbors = RANK_INDEX.around(user_id, k)
+    emails = {
+        row['user_id']: row.get('email', '')
+        async for row in db.user_stats.find(
+            {'user_id': {'$in': [entry['user_id'] for entry in neighbors]}}, {'_id': 0, 'user_id': 1, 'email': 1}
+        )
+    }
+    return trusted_response({
+        'rank': rank,
+        'total_players': len(RANK_INDEX),
+        'neighbors': [{**entry, 'email': emails[entry['user_id']]} for entry in neighbors if entry['user_id'] in emails]
+    })
 
 # ==================== USER ENDPOINTS ====================
 
 @api_router.get("/user/collection", response_model=List[Fish])
 async def get_user_collection(user: dict = Depends(verify_token)):
-    unlocks = await db.user_fish.find({'user_id': user['user_id']}, {'_id': 0}).to_list(100)
-    fish_ids = [u['fish_id'] for u in unlocks]
-    
-    fish = await db.fish.find({'id': {'$in': fish_ids}}, {'_id': 0}).to_list(100)
-    return fish
+    stats = await get_stats_doc(user['user_id'])
+    owned = owned_ordinals(stats.get('owned_bits') if stats else None)
+    return trusted_response([CATALOG.by_ordinal[ordinal] for ordinal in owned if ordinal in CATALOG.by_ordinal])
+
+async def owned_fish(user_id: str, catalog: FishCatalog, rarity: Optional[str], habitat: Optional[str],
+                     after: Optional[int] = None):
+    """Lazily yield the user's matching fish in ordinal order, after the `after` ordinal."""
+    stats = await get_stats_doc(user_id)
+    owned = owned_ordinals(stats.get('owned_bits') if stats else None)
+    start = bisect.bisect_right(owned, after) if after is not None else 0
+    return (
+        catalog.by_ordinal[ordinal] for ordinal in owned[start:]
+        if ordinal in catalog.by_ordinal and fish_matches(catalog.by_ordinal[ordinal], rarity, habitat)
+    )
+
+@api_router.get("/user/collection/page", response_model=FishPage)
+async def get_user_collection_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=FISH_PAGE_MAX),
+    rarity: Optional[str] = None,
+    habitat: Optional[str] = None,
+    user: dict = Depends(verify_token)
+):
+    catalog = CATALOG
+    fish = await owned_fish(user['user_id'], catalog, rarity, habitat, decode_fish_cursor(cursor))
+    items = list(islice(fish, limit + 1))
+    return fish_page_response(catalog, items[:limit], len(items) > limit)
+
+@api_router.get("/user/collection/stream")
+async def stream_user_collection(
+    rarity: Optional[str] = None,
+    habitat: Optional[str] = None,
+    user: dict = Depends(verify_token)
+):
+    catalog = CATALOG
+    fish = await owned_fish(user['user_id'], catalog, rarity, habitat)
+    return StreamingResponse(ndjson_stream(catalog, fish), media_type='application/x-ndjson')
 
 @api_router.get("/user/stats")
 async def get_user_stats(user: dict = Depends(verify_token)):
-    stats = await db.user_stats.find_one({'user_id': user['user_id']}, {'_id': 0})
+    stats = await get_stats_doc(user['user_id'])
     if not stats:
-        return {'total_points': 0, 'total_fish': 0}
-    return {'total_points': stats.get('total_points', 0), 'total_fish': stats.get('total_fish', 0)}
+        return trusted_response({'total_points': 0, 'total_fish': 0})
+    return trusted_response({'total_points': stats.get('total_points', 0), 'total_fish': stats.get('total_fish', 0)})
+
+# ==================== BOOTSTRAP ENDPOINT ====================
+
+@api_router.get("/bootstrap", response_model=Bootstrap)
+async def get_bootstrap(user: dict = Depends(verify_token)):
+    # Everything except the caller's stats is already serialized in memory,
+    # so a page load costs one token check and one user_stats read
+    stats = await get_stats_doc(user['user_id'])
+    own_stats = {
+        'total_points': stats.get('total_points', 0) if stats else 0,
+        'total_fish': stats.get('total_fish', 0) if stats else 0
+    }
+    body = b''.join([
+        b'{"aquarium":', get_aquarium_fish()['body'],
+        b',"fish":', CATALOG.list_body,
+        b',"leaderboard":', LEADERBOARD.body(),
+        b',"stats":', json_bytes(own_stats),
+        b',"gacha":', json_bytes(gacha_status_from_stats(stats).model_dump()),
+        b'}'
+    ])
+    return Response(content=body, media_type='application/json', headers={'Cache-Control': 'private, no-cache'})
+
+# ==================== STREAM ENDPOINTS ====================
+
+@api_router.post("/stream/ticket")
+async def create_stream_ticket(user: dict = Depends(verify_token)):
+    """Single-use ticket for opening /api/stream.
+
+    EventSource cannot send headers, so the stream is authorized by a query
+    parameter. A ticket rather than the JWT goes in the URL, so access logs
+    only ever see a value that is already spent or about to expire. Tickets
+    live in Mongo, so any worker can redeem one.
+    """
+    ticket = secrets.token_urlsafe(32)
+    await db.stream_tickets.insert_one({
+        '_id': ticket,
+        'user_id': user['user_id'],
+        'expires_at': datetime.now(timezone.utc) + timedelta(seconds=STREAM_TICKET_TTL_SECONDS)
+    })
+    return {'ticket': ticket, 'expires_in': STREAM_TICKET_TTL_SECONDS}
+
+async def redeem_stream_ticket(ticket: str) -> str:
+    # The TTL index only sweeps once a minute, so expiry is checked here too
+    doc = await db.stream_tickets.find_one_and_delete(
+        {'_id': ticket, 'expires_at': {'$gt': datetime.now(timezone.utc)}}
+    )
+    if not doc:
+        raise HTTPException(status_code=401, detail="Invalid or expired stream ticket")
+    return doc['user_id']
+
+@api_router.get("/stream")
+async def stream_events(request: Request, ticket: Optional[str] = None):
+    """Server-sent events: leaderboard deltas for everyone, stats for the caller.
+
+    Browsers authorize with `?ticket=` from POST /api/stream/ticket; other
+    clients may send the usual bearer token instead.
+    """
+    authorization = request.headers.get('authorization', '')
+    if authorization.lower().startswith('bearer '):
+        user_id = decode_token(authorization[7:])['user_id']
+    elif ticket:
+        user_id = await redeem_stream_ticket(ticket)
+    else:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+
+    stats = await get_stats_doc(user_id)
+    queue = STREAM_HUB.subscribe(user_id)
+    initial = [
+        sse_message('leaderboard', LEADERBOARD.snapshot()),
+        sse_message('stats', stats_event(stats))
+    ]
+
+    async def events():
+        try:
+            for message in initial:
+                yield message
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b': keepalive\n\n'
+        finally:
+            STREAM_HUB.unsubscribe(user_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+# ==================== HEALTH ENDPOINTS ====================
+
+@api_router.get("/health/live")
+async def health_live():
+    return {'status': 'alive'}
+
+@api_router.get("/health/ready")
+async def health_ready():
+    # Only flips once startup has warmed the pool and loaded everything
+    if not app.state.ready:
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {'status': 'ready'}
+
+# ==================== ADMIN ENDPOINTS ====================
+
+@api_router.post("/admin/catalog/reload")
+async def reload_catalog(admin: None = Depends(verify_admin)):
+    # Other workers pick the new version up on their next poll
+    await bump_catalog_version()
+    await load_catalog()
+    return {'message': 'Catalog reloaded', 'fish': len(CATALOG.fish), 'version': CATALOG_VERSION}
+
+@api_router.post("/admin/simulate")
+async def run_simulation(request: SimulationRequest, admin: None = Depends(verify_admin)):
+    total_pulls = request.players * request.days * request.pulls_per_day
+    if total_pulls > SIMULATION_MAX_PULLS:
+        raise HTTPException(status_code=400, detail=f"Simulation is limited to {SIMULATION_MAX_PULLS} pulls")
+    
+    # Unspecified rarities keep their live weight
+    weights = {**RARITY_WEIGHTS, **(request.weights or {})}
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            None, simulate, [dict(fish) for fish in CATALOG.fish], weights,
+            request.players, request.days, request.pulls_per_day, request.seed
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@api_router.get("/admin/profiles")
+async def list_profiles(admin: None = Depends(verify_admin)):
+    return [{k: v for k, v in profile.items() if k != 'speedscope'} for profile in reversed(PROFILES)]
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, admin: None = Depends(verify_admin)):
+    for profile in PROFILES:
+        if profile['id'] == profile_id:
+            return Response(
+                content=json_bytes(profile['speedscope']),
+                media_type='application/json',
+                headers={'Content-Disposition': f'attachment; filename="{profile_id}.speedscope.json"'}
+            )
+    raise HTTPException(status_code=404, detail="Profile not found")
+
+@api_router.get("/admin/drop-rates")
+async def get_drop_rates(days: int = Query(7, ge=1, le=PULL_LOG_RETENTION_DAYS), admin: None = Depends(verify_admin)):
+    return await drop_rate_report(days)
+
+# ==================== METRICS ENDPOINTS ====================
+
+@api_router.get("/metrics")
+async def get_metrics(admin: None = Depends(verify_admin)):
+    return {
+        'auth_pool': AUTH_POOL.snapshot(),
+        'token_cache': TOKEN_CACHE.snapshot(),
+        'stats_cache': STATS_CACHE.snapshot(),
+        'stream': STREAM_HUB.snapshot(),
+        'write_behind': WRITE_BEHIND.snapshot(),
+        'rate_limits': {
+            'enabled': RATE_LIMITS_ENABLED,
+            'backend': RATE_LIMITER.backend,
+            'buckets': RATE_LIMITER.size(),
+            'routes': {name: limit.snapshot() for name, limit in ROUTE_LIMITS.items()}
+        },
+        'rank_index': {
+            'players': len(RANK_INDEX),
+            'rebuilt_at': RANK_INDEX.rebuilt_at.isoformat() if RANK_INDEX.rebuilt_at else None
+        }
+    }
+
+def prometheus_gauges() -> List[str]:
+    """Point-in-time values from subsystems that keep their own counters."""
+    values = [
+        ('auth_pool_pending_jobs', 'gauge', 'bcrypt jobs running or queued.', AUTH_POOL.snapshot()['pending']),
+        ('auth_pool_rejected_total', 'counter', 'Auth requests rejected because the pool was full.', AUTH_POOL.rejected),
+        ('token_cache_hits_total', 'counter', 'Verified-token cache hits.', TOKEN_CACHE.hits),
+        ('token_cache_misses_total', 'counter', 'Verified-token cache misses.', TOKEN_CACHE.misses),
+        ('token_cache_entries', 'gauge', 'Entries in the verified-token cache.', TOKEN_CACHE.snapshot()['size']),
+        ('stats_cache_hits_total', 'counter', 'user_stats cache hits.', STATS_CACHE.hits),
+        ('stats_cache_misses_total', 'counter', 'user_stats cache misses.', STATS_CACHE.misses),
+        ('stats_cache_entries', 'gauge', 'Entries in the user_stats cache.', STATS_CACHE.snapshot()['size']),
+        ('stream_subscribers', 'gauge', 'Open event stream connections.', STREAM_HUB.snapshot()['subscribers']),
+        ('stream_messages_total', 'counter', 'Event stream messages published.', STREAM_HUB.messages),
+        ('stream_dropped_total', 'counter', 'Event stream messages dropped for slow subscribers.', STREAM_HUB.dropped),
+        ('write_behind_pending_operations', 'gauge', 'Operations buffered for the next write-behind flush.', WRITE_BEHIND.pending),
+        ('write_behind_flushed_operations_total', 'counter', 'Operations written by write-behind flushes.', WRITE_BEHIND.flushed),
+        ('write_behind_retried_operations_total', 'counter', 'Failed write-behind operations re-queued for one more attempt.', WRITE_BEHIND.retried),
+        ('rank_index_players', 'gauge', 'Players in the in-process rank index.', len(RANK_INDEX))
+    ]
+    lines = []
+    for name, kind, help_text, value in values:
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return lines
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    lines = []
+    for metric in (REQUEST_LATENCY, REQUESTS_TOTAL, MONGO_COMMAND_LATENCY, MONGO_COMMAND_FAILURES,
+                   AUTH_QUEUE_WAIT, AUTH_HASH_TIME, WRITE_BEHIND_BATCH, WRITE_BEHIND_LAG, WRITE_BEHIND_FAILED,
+                   RATE_LIMITED, ROUTE_SHED):
+        lines += metric.render()
+    lines += prometheus_gauges()
+    return Response(content='\n'.join(lines) + '\n', media_type='text/plain; version=0.0.4')
 
 # ==================== APP INITIALIZATION ====================
 
@@ -400,6 +2977,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+if ADMIN_TOKEN or PROFILE_SAMPLE_RATE:
+    app.add_middleware(ProfilingMiddleware)
+
+app.add_middleware(MetricsMiddleware)
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -408,9 +2990,31 @@ logger = logging.getLogger(__name__)
 
 @app.on_event("startup")
 async def startup():
+    await warm_connection_pool()
     await init_fish_data()
+    await ensure_pull_log()
+    await ensure_indexes()
+    await load_catalog()
+    await backfill_owned_bits()
+    await backfill_stats_email()
+    if QUERY_PLAN_CHECK:
+        await verify_query_plans()
+    await refresh_leaderboard()
+    app.state.leaderboard_task = asyncio.create_task(leaderboard_refresh_loop())
+    await rebuild_rank_index()
+    app.state.rank_task = asyncio.create_task(rank_rebuild_loop())
+    app.state.catalog_task = asyncio.create_task(catalog_watch_loop())
+    WRITE_BEHIND.start()
+    get_aquarium_fish()
+    app.state.ready = True
     logger.info("Application started")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.ready = False
+    app.state.leaderboard_task.cancel()
+    app.state.rank_task.cancel()
+    app.state.catalog_task.cancel()
+    await WRITE_BEHIND.close()
+    AUTH_POOL.shutdown()
     client.close()
@@ -12,6 +12,17 @@ import { toast } from 'sonner';
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Merge a leaderboard event from /api/stream into the current standings
+const applyLeaderboardDelta = (current, delta) => {
+  if (delta.snapshot) {
+    return delta.updated;
+  }
+  const byUser = new Map(current.map((entry) => [entry.user_id, entry]));
+  delta.removed.forEach((userId) => byUser.delete(userId));
+  delta.updated.forEach((entry) => byUser.set(entry.user_id, entry));
+  return Array.from(byUser.values()).sort((a, b) => a.rank - b.rank);
+};
+
 export default function MainPage({ onLogout }) {
   const [aquariumFish, setAquariumFish] = useState([]);
   const [allFish, setAllFish] = useState([]);
@@ -39,52 +50,17 @@ export default function MainPage({ onLogout }) {
     }
   };
 
-  const fetchAllFish = async () => {
-    try {
-      const response = await axios.get(`${API}/fish/all`, getAuthHeaders());
-      setAllFish(response.data);
-    } catch (error) {
-      console.error('Error fetching all fish:', error);
-    }
-  };
-
-  const fetchLeaderboard = async () => {
-    try {
-      const response = await axios.get(`${API}/leaderboard`, getAuthHeaders());
-      setLeaderboard(response.data);
-    } catch (error) {
-      console.error('Error fetching leaderboard:', error);
-    }
-  };
-
-  const fetchUserStats = async () => {
-    try {
-      const response = await axios.get(`${API}/user/stats`, getAuthHeaders());
-      setUserStats(response.data);
-    } catch (error) {
-      console.error('Error fetching user stats:', error);
-    }
-  };
-
-  const fetchGachaStatus = async () => {
-    try {
-      const response = await axios.get(`${API}/gacha/status`, getAuthHeaders());
-      setCasesRemaining(response.data.cases_remaining);
-    } catch (error) {
-      console.error('Error fetching gacha status:', error);
-    }
-  };
-
   useEffect(() => {
+    // Everything the page needs on mount comes back in one request
     const initializeData = async () => {
       try {
-        await Promise.all([
-          fetchAquariumFish(),
-          fetchAllFish(),
-          fetchLeaderboard(),
-          fetchUserStats(),
-          fetchGachaStatus()
-        ]);
+        const response = await axios.get(`${API}/bootstrap`, getAuthHeaders());
+        const { aquarium, fish, leaderboard, stats, gacha } = response.data;
+        setAquariumFish(aquarium);
+        setAllFish(fish);
+        setLeaderboard(leaderboard);
+        setUserStats(stats);
+        setCasesRemaining(gacha.cases_remaining);
       } catch (error) {
         console.error('Error initializing data:', error);
       }
@@ -93,11 +69,57 @@ export default function MainPage({ onLogout }) {
     initializeData();
 
     const aquariumInterval = setInterval(fetchAquariumFish, 30 * 60 * 1000);
-    const leaderboardInterval = setInterval(fetchLeaderboard, 10000);
+
+    // Leaderboard and own stats are pushed by the server instead of polled.
+    // Events only come from this page's worker, so other workers' changes
+    // reach the board with its periodic refresh.
+    let events = null;
+    let reconnectTimer = null;
+    let closed = false;
+
+    const connectStream = async () => {
+      try {
+        // A single-use ticket keeps the JWT out of the URL and access logs
+        const response = await axios.post(`${API}/stream/ticket`, {}, getAuthHeaders());
+        if (closed) {
+          return;
+        }
+        events = new EventSource(`${API}/stream?ticket=${encodeURIComponent(response.data.ticket)}`);
+        events.addEventListener('leaderboard', (event) => {
+          const delta = JSON.parse(event.data);
+          setLeaderboard((current) => applyLeaderboardDelta(current, delta));
+        });
+        events.addEventListener('stats', (event) => {
+          const stats = JSON.parse(event.data);
+          setUserStats({ total_points: stats.total_points, total_fish: stats.total_fish });
+          setCasesRemaining(stats.cases_remaining);
+        });
+        events.onerror = () => {
+          // The browser's own retry reuses the spent ticket, so reconnect with a new one
+          events.close();
+          scheduleReconnect();
+        };
+      } catch (error) {
+        console.error('Error opening event stream:', error);
+        scheduleReconnect();
+      }
+    };
+
+    const scheduleReconnect = () => {
+      if (!closed) {
+        reconnectTimer = setTimeout(connectStream, 5000);
+      }
+    };
+
+    connectStream();
 
     return () => {
+      closed = true;
       clearInterval(aquariumInterval);
-      clearInterval(leaderboardInterval);
+      clearTimeout(reconnectTimer);
+      if (events) {
+        events.close();
+      }
     };
   }, []);
 
@@ -132,7 +154,7 @@ export default function MainPage({ onLogout }) {
         }
       );
 
-      const { fish, is_new, total_points } = response.data;
+      const { fish, is_new, total_points, cases_remaining } = response.data;
       
       // Pass result back to slot machine
       onResultReady(fish);
@@ -142,10 +164,9 @@ export default function MainPage({ onLogout }) {
         total_points: total_points,
         total_fish: is_new ? userStats.total_fish + 1 : userStats.total_fish
       });
+      setCasesRemaining(cases_remaining);
 
-      // Update UI
-      fetchLeaderboard();
-      fetchGachaStatus();
+      // Leaderboard updates arrive over /api/stream
 
       // Show toast notification
       setTimeout(() => {
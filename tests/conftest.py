@@ -0,0 +1,49 @@
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'aquarium_test')
+os.environ.setdefault('RATE_LIMITS', 'false')
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'backend'))
+
+import server  # noqa: E402
+
+
+@pytest.fixture
+def mongo(monkeypatch):
+    """Point the server at a fresh in-memory database with fresh per-worker state."""
+    from mongomock_motor import AsyncMongoMockClient
+
+    client = AsyncMongoMockClient()
+    monkeypatch.setattr(server, 'client', client)
+    monkeypatch.setattr(server, 'db', client[os.environ['DB_NAME']])
+    monkeypatch.setattr(server, 'RANK_INDEX', server.RankIndex())
+    monkeypatch.setattr(server, 'LEADERBOARD', server.MaterializedLeaderboard(server.LEADERBOARD_SIZE))
+    monkeypatch.setattr(server, 'STATS_CACHE', server.UserStatsCache(
+        server.STATS_CACHE_SIZE, server.STATS_CACHE_TTL_SECONDS, server.STATS_CACHE_ENABLED
+    ))
+    # Holds asyncio primitives, which bind to the loop of the test that first uses them
+    monkeypatch.setattr(server, 'WRITE_BEHIND', server.WriteBehindQueue(
+        server.WRITE_BEHIND_FLUSH_SECONDS, server.WRITE_BEHIND_BATCH_SIZE, server.WRITE_BEHIND_MAX_PENDING
+    ))
+    # App shutdown stops the pool, and each test runs startup and shutdown again
+    monkeypatch.setattr(server, 'AUTH_POOL', server.AuthWorkerPool(server.AUTH_POOL_SIZE, server.AUTH_POOL_MAX_QUEUE))
+    return server.db
+
+
+@pytest.fixture
+def serve(mongo):
+    """Run `scenario(client)` against the app, with startup and shutdown around it."""
+    import httpx
+
+    async def run(scenario):
+        async with server.app.router.lifespan_context(server.app):
+            transport = httpx.ASGITransport(app=server.app)
+            async with httpx.AsyncClient(transport=transport, base_url='http://test') as client:
+                return await scenario(client)
+
+    return run
+
@@ -0,0 +1,40 @@
+import random
+
+import numpy as np
+import pytest
+
+from server import AliasSampler, wilson_interval
+
+WEIGHTS = [50, 30, 30, 15, 5, 1]
+
+
+def catalog_items(n: int) -> list:
+    return [{'id': str(i)} for i in range(n)]
+
+
+def test_alias_table_reproduces_the_weights():
+    sampler = AliasSampler(catalog_items(len(WEIGHTS)), WEIGHTS)
+    n = len(WEIGHTS)
+
+    implied = [p / n for p in sampler._prob]
+    for column, target in enumerate(sampler._alias):
+        implied[target] += (1 - sampler._prob[column]) / n
+
+    total = sum(WEIGHTS)
+    assert implied == pytest.approx([weight / total for weight in WEIGHTS], abs=1e-12)
+    assert sampler.probabilities == pytest.approx([weight / total for weight in WEIGHTS])
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_draws_follow_the_weights(batched):
+    sampler = AliasSampler(catalog_items(len(WEIGHTS)), WEIGHTS)
+    random.seed(7)
+    sampler._rng = np.random.default_rng(7)
+    trials = 200_000
+
+    drawn = sampler.draw_many(trials) if batched else [sampler.draw() for _ in range(trials)]
+
+    counts = np.bincount([int(item['id']) for item in drawn], minlength=len(WEIGHTS))
+    for hits, expected in zip(counts.tolist(), sampler.probabilities):
+        low, high = wilson_interval(hits, trials, z=5)
+        assert low <= expected <= high
@@ -0,0 +1,14 @@
+import asyncio
+
+
+def test_concurrent_registrations_for_one_email_get_a_400(serve, mongo):
+    async def scenario(client):
+        body = {'email': 'race@example.com', 'password': 'password'}
+        responses = await asyncio.gather(*(client.post('/api/auth/register', json=body) for _ in range(2)))
+        return sorted((response.status_code, response.json().get('detail')) for response in responses)
+
+    results = asyncio.run(serve(scenario))
+
+    assert results == [(200, None), (400, 'Email already registered')]
+    assert asyncio.run(mongo.users.count_documents({'email': 'race@example.com'})) == 1
+    assert asyncio.run(mongo.user_stats.count_documents({})) == 1
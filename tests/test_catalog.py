@@ -0,0 +1,41 @@
+import asyncio
+
+import server
+
+
+def test_removed_species_ordinal_is_not_reused(mongo):
+    async def scenario():
+        await server.init_fish_data()
+        await server.load_catalog()
+        top = max(server.CATALOG.ordinals.values())
+        top_id = server.CATALOG.by_ordinal[top]['id']
+
+        await mongo.fish.delete_one({'id': top_id})
+        await mongo.fish.insert_one(dict(server.FISH_DATA[0], id='100', name='Новая рыба'))
+        await server.load_catalog()
+        return top, top_id, dict(server.CATALOG.ordinals)
+
+    top, top_id, ordinals = asyncio.run(scenario())
+
+    assert top_id not in ordinals
+    assert ordinals['100'] == top + 1
+    assert len(set(ordinals.values())) == len(ordinals)
+
+
+def test_new_species_are_numbered_in_id_order(mongo):
+    async def scenario():
+        await server.init_fish_data()
+        await mongo.fish.insert_many([
+            dict(server.FISH_DATA[0], id='20', name='Б'), dict(server.FISH_DATA[0], id='19', name='А')
+        ])
+        await server.load_catalog()
+        # A second load finds them numbered and reserves nothing
+        await server.load_catalog()
+        stored = await mongo.fish.find({'id': {'$in': ['19', '20']}}, {'_id': 0, 'id': 1, 'ordinal': 1}).to_list(None)
+        return stored, await mongo.catalog_meta.find_one({'_id': 'catalog'})
+
+    stored, meta = asyncio.run(scenario())
+
+    base = len(server.FISH_DATA)
+    assert sorted((doc['id'], doc['ordinal']) for doc in stored) == [('19', base), ('20', base + 1)]
+    assert meta['next_ordinal'] == base + 2
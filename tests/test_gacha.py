@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+import server
+from server import owned_ordinals
+
+
+async def register(client, email: str) -> dict:
+    response = await client.post('/api/auth/register', json={'email': email, 'password': 'password'})
+    assert response.status_code == 200, response.text
+    return {'Authorization': f"Bearer {response.json()['token']}"}
+
+
+def test_concurrent_opens_spend_the_last_case_once(serve, mongo):
+    async def scenario(client):
+        headers = await register(client, 'twice@example.com')
+        responses = await asyncio.gather(*(client.post('/api/gacha/open', headers=headers) for _ in range(2)))
+        status = await client.get('/api/gacha/status', headers=headers)
+        return sorted(response.status_code for response in responses), status.json()
+
+    statuses, status = asyncio.run(serve(scenario))
+
+    assert server.GACHA_DAILY_CASES == 1
+    assert statuses == [200, 400]
+    assert status['cases_remaining'] == 0
+    stats = asyncio.run(mongo.user_stats.find_one({}, {'_id': 0}))
+    assert stats['daily_cases_used'] == 1
+    assert stats['total_fish'] == 1
+    assert stats['version'] == 1
+    assert 'case_granted' not in stats and 'pull_new_ids' not in stats
+
+
+def test_pull_outcome_matches_the_stored_document(mongo, monkeypatch):
+    monkeypatch.setattr(server, 'GACHA_DAILY_CASES', 25)
+    user = {'user_id': 'player', 'email': 'player@example.com'}
+
+    async def scenario():
+        results = []
+        for count in (10, 10, 10):
+            try:
+                pulls, stats = await server.perform_pulls(user, count)
+            except HTTPException as e:
+                results.append(e.status_code)
+                continue
+            stored = await mongo.user_stats.find_one({'user_id': 'player'}, {'_id': 0})
+            results.append((pulls, stats, stored))
+        return results
+
+    first, second, rejected = asyncio.run(scenario())
+
+    assert rejected == 400
+    seen = set()
+    for pulls, stats, stored in (first, second):
+        assert stats == stored
+        for pull in pulls:
+            assert pull.is_new == (pull.fish.id not in seen)
+            seen.add(pull.fish.id)
+    _, stats, _ = second
+    assert stats['daily_cases_used'] == 20
+    assert stats['version'] == 2
+    assert stats['total_fish'] == len(seen)
+    assert stats['total_points'] == sum(server.CATALOG.by_id[fish_id]['points'] for fish_id in seen)
+    assert owned_ordinals(stats['owned_bits']) == sorted(server.CATALOG.ordinals[fish_id] for fish_id in seen)
+
+
+def test_rejected_pull_does_not_bump_version(mongo):
+    user = {'user_id': 'player', 'email': 'player@example.com'}
+
+    async def scenario():
+        await server.perform_pulls(user, 1)
+        with pytest.raises(HTTPException) as rejected:
+            await server.perform_pulls(user, 1)
+        return rejected.value, await mongo.user_stats.find_one({'user_id': 'player'}, {'_id': 0})
+
+    rejected, stored = asyncio.run(scenario())
+    assert rejected.status_code == 400
+    assert stored['version'] == 1
+    assert stored['daily_cases_used'] == 1
+
+
+def test_pull_response_carries_remaining_cases(serve):
+    async def scenario(client):
+        headers = await register(client, 'cases@example.com')
+        return (await client.post('/api/gacha/open', headers=headers)).json()
+
+    result = asyncio.run(serve(scenario))
+    assert result['cases_remaining'] == 0
+    assert result['total_points'] == (result['fish']['points'] if result['is_new'] else 0)
@@ -0,0 +1,42 @@
+import asyncio
+
+import pytest
+
+import server
+
+
+def test_duplicate_unlocks_are_removed_before_the_unique_index(mongo):
+    async def scenario():
+        await mongo.user_fish.insert_many([
+            {'user_id': 'a', 'fish_id': '1', 'unlocked_at': '2024-01-02T00:00:00'},
+            {'user_id': 'a', 'fish_id': '1', 'unlocked_at': '2024-01-01T00:00:00'},
+            {'user_id': 'a', 'fish_id': '1', 'unlocked_at': '2024-01-03T00:00:00'},
+            {'user_id': 'a', 'fish_id': '2', 'unlocked_at': '2024-01-01T00:00:00'},
+            {'user_id': 'b', 'fish_id': '1', 'unlocked_at': '2024-01-05T00:00:00'}
+        ])
+        await server.ensure_indexes()
+        # A second startup finds the index in place and skips the check
+        await server.ensure_indexes()
+        rows = await mongo.user_fish.find({}, {'_id': 0}).sort([('user_id', 1), ('fish_id', 1)]).to_list(None)
+        return rows, await mongo.user_fish.index_information()
+
+    rows, indexes = asyncio.run(scenario())
+
+    assert [(row['user_id'], row['fish_id'], row['unlocked_at'][:10]) for row in rows] == [
+        ('a', '1', '2024-01-01'), ('a', '2', '2024-01-01'), ('b', '1', '2024-01-05')
+    ]
+    assert indexes['user_fish_unique']['unique'] is True
+
+
+def test_duplicate_emails_stop_startup_with_the_offending_keys(mongo):
+    async def scenario():
+        await mongo.users.insert_many([
+            {'id': 'u1', 'email': 'twice@example.com'},
+            {'id': 'u2', 'email': 'twice@example.com'},
+            {'id': 'u3', 'email': 'once@example.com'}
+        ])
+        await server.ensure_indexes()
+
+    with pytest.raises(RuntimeError, match='email_unique.*twice@example.com'):
+        asyncio.run(scenario())
+    assert asyncio.run(mongo.users.count_documents({})) == 3
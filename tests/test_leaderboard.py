@@ -0,0 +1,94 @@
+import asyncio
+
+import server
+from server import MaterializedLeaderboard
+
+
+def row(user_id: str, points: int, fish: int = 1) -> dict:
+    return {'user_id': user_id, 'email': f"{user_id}@example.com", 'total_points': points, 'total_fish': fish}
+
+
+def board(size: int, *rows) -> MaterializedLeaderboard:
+    leaderboard = MaterializedLeaderboard(size)
+    leaderboard.load(list(rows))
+    return leaderboard
+
+
+def standings(leaderboard: MaterializedLeaderboard) -> list:
+    return [(entry['rank'], entry['user_id'], entry['total_points']) for entry in leaderboard.entries]
+
+
+def test_load_ranks_rows():
+    leaderboard = board(5, row('b', 20), row('a', 30), row('c', 20, fish=2))
+    assert standings(leaderboard) == [(1, 'a', 30), (2, 'c', 20), (3, 'b', 20)]
+    assert leaderboard.snapshot() == {'snapshot': True, 'updated': leaderboard.entries, 'removed': []}
+
+
+def test_overtaking_reports_every_moved_entry():
+    leaderboard = board(5, row('a', 30), row('b', 20), row('c', 10))
+
+    delta = leaderboard.update('c', 'c@example.com', 40, 2)
+
+    assert standings(leaderboard) == [(1, 'c', 40), (2, 'a', 30), (3, 'b', 20)]
+    assert delta['snapshot'] is False
+    assert delta['removed'] == []
+    assert [(entry['user_id'], entry['rank']) for entry in delta['updated']] == [('c', 1), ('a', 2), ('b', 3)]
+
+
+def test_in_place_update_keeps_ranks_unique():
+    leaderboard = board(5, row('a', 30), row('b', 20), row('c', 10))
+
+    delta = leaderboard.update('a', 'a@example.com', 35, 2)
+
+    assert standings(leaderboard) == [(1, 'a', 35), (2, 'b', 20), (3, 'c', 10)]
+    assert [(entry['user_id'], entry['rank']) for entry in delta['updated']] == [('a', 1)]
+
+    leaderboard.update('b', 'b@example.com', 50, 2)
+    assert standings(leaderboard) == [(1, 'b', 50), (2, 'a', 35), (3, 'c', 10)]
+
+
+def test_new_entry_pushes_the_last_one_out():
+    leaderboard = board(3, row('a', 30), row('b', 20), row('c', 10))
+
+    delta = leaderboard.update('d', 'd@example.com', 25, 1)
+
+    assert standings(leaderboard) == [(1, 'a', 30), (2, 'd', 25), (3, 'b', 20)]
+    assert delta['removed'] == ['c']
+    assert [entry['user_id'] for entry in delta['updated']] == ['d', 'b']
+
+
+def test_updates_that_change_nothing_return_none():
+    leaderboard = board(3, row('a', 30), row('b', 20), row('c', 10))
+
+    assert leaderboard.update('d', 'd@example.com', 5, 1) is None
+    assert leaderboard.update('b', 'b@example.com', 20, 1) is None
+    assert standings(leaderboard) == [(1, 'a', 30), (2, 'b', 20), (3, 'c', 10)]
+
+
+def test_body_is_reserialized_after_a_change():
+    leaderboard = board(3, row('a', 30))
+    first = leaderboard.body()
+    assert leaderboard.body() is first
+
+    leaderboard.update('a', 'a@example.com', 40, 2)
+    assert leaderboard.body() != first
+
+
+def test_board_reads_email_from_stats_after_backfill(mongo):
+    async def scenario():
+        await mongo.users.insert_many([{'id': 'old', 'email': 'old@example.com'}])
+        await mongo.user_stats.insert_many([
+            {'user_id': 'old', 'total_points': 30, 'total_fish': 1, 'version': 4},
+            {'user_id': 'new', 'email': 'new@example.com', 'total_points': 20, 'total_fish': 1, 'version': 1}
+        ])
+        await server.backfill_stats_email()
+        await server.refresh_leaderboard()
+        stored = await mongo.user_stats.find_one({'user_id': 'old'}, {'_id': 0})
+        return stored, await server.leaderboard_page(None, 10)
+
+    stored, page = asyncio.run(scenario())
+
+    assert (stored['email'], stored['version']) == ('old@example.com', 5)
+    expected = [('old', 'old@example.com'), ('new', 'new@example.com')]
+    assert [(entry['user_id'], entry['email']) for entry in server.LEADERBOARD.entries] == expected
+    assert [(entry['user_id'], entry['email']) for entry in page['entries']] == expected
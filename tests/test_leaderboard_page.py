@@ -0,0 +1,70 @@
+import asyncio
+import random
+
+import server
+
+SCORES = [(30, 3), (30, 3), (30, 2), (20, 5), (20, 1), (20, 1), (10, 0), (0, 0)]
+
+
+def seed_rows(mongo, scores):
+    rows = [
+        {'user_id': f"user{i}", 'email': f"user{i}@example.com", 'total_points': points, 'total_fish': fish}
+        for i, (points, fish) in enumerate(scores)
+    ]
+
+    async def insert():
+        await mongo.users.insert_many([{'id': row['user_id'], 'email': row['email']} for row in rows])
+        await mongo.user_stats.insert_many([dict(row) for row in rows])
+        await server.rebuild_rank_index()
+
+    asyncio.run(insert())
+    return sorted(rows, key=lambda row: (-row['total_points'], -row['total_fish'], row['user_id']))
+
+
+def test_leaderboard_after_returns_exactly_the_rows_below_the_cursor(mongo):
+    ordered = seed_rows(mongo, SCORES)
+
+    async def below(row):
+        position = (row['user_id'], row['total_points'], row['total_fish'])
+        docs = await mongo.user_stats.find(server.leaderboard_after(position), {'_id': 0, 'user_id': 1}).to_list(None)
+        return {doc['user_id'] for doc in docs}
+
+    for index, row in enumerate(ordered):
+        assert asyncio.run(below(row)) == {other['user_id'] for other in ordered[index + 1:]}
+
+
+def test_pages_cover_the_board_once_with_consecutive_ranks(mongo):
+    rng = random.Random(3)
+    ordered = seed_rows(mongo, [(rng.choice([0, 10, 20]), rng.randrange(3)) for _ in range(23)])
+
+    async def walk():
+        entries, after = [], None
+        while True:
+            page = await server.leaderboard_page(after, 5)
+            entries += page['entries']
+            if not page['next_cursor']:
+                return entries
+            after = server.decode_leaderboard_cursor(page['next_cursor'])
+
+    entries = asyncio.run(walk())
+
+    assert [entry['user_id'] for entry in entries] == [row['user_id'] for row in ordered]
+    assert [entry['rank'] for entry in entries] == list(range(1, len(ordered) + 1))
+    assert entries[0]['email'] == ordered[0]['email']
+
+
+def test_ranks_follow_row_order_when_the_index_is_stale(mongo):
+    seed_rows(mongo, [(50, 1), (40, 1), (30, 1), (20, 1)])
+
+    async def pages():
+        # Another worker moved user3 to the top; this worker's index has not seen it
+        await mongo.user_stats.update_one({'user_id': 'user3'}, {'$set': {'total_points': 60}})
+        first = await server.leaderboard_page(None, 2)
+        second = await server.leaderboard_page(server.decode_leaderboard_cursor(first['next_cursor']), 2)
+        return first['entries'] + second['entries']
+
+    entries = asyncio.run(pages())
+
+    assert [(entry['rank'], entry['user_id']) for entry in entries] == [
+        (1, 'user3'), (2, 'user0'), (3, 'user1'), (4, 'user2')
+    ]
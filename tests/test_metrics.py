@@ -0,0 +1,19 @@
+import asyncio
+
+import server
+
+
+def test_json_metrics_require_the_admin_token(serve, monkeypatch):
+    monkeypatch.setattr(server, 'ADMIN_TOKEN', 'secret')
+
+    async def scenario(client):
+        anonymous = await client.get('/api/metrics')
+        wrong = await client.get('/api/metrics', headers={'X-Admin-Token': 'guess'})
+        admin = await client.get('/api/metrics', headers={'X-Admin-Token': 'secret'})
+        scrape = await client.get('/metrics')
+        return anonymous.status_code, wrong.status_code, admin, scrape.status_code
+
+    anonymous, wrong, admin, scrape = asyncio.run(serve(scenario))
+
+    assert (anonymous, wrong, admin.status_code, scrape) == (403, 403, 200, 200)
+    assert 'rank_index' in admin.json()
@@ -0,0 +1,132 @@
+import asyncio
+import json
+import random
+
+import server
+from server import RankIndex, build_rank_tree
+
+
+def reference_order(scores: dict) -> list:
+    return sorted(scores, key=lambda user_id: (-scores[user_id][0], -scores[user_id][1], user_id))
+
+
+def filled_index(scores: dict) -> RankIndex:
+    index = RankIndex()
+    for user_id, (points, fish) in scores.items():
+        index.update(user_id, points, fish)
+    return index
+
+
+def test_rank_and_slice_match_sorted_order():
+    rng = random.Random(1)
+    scores = {f"user{i:03d}": (0, 0) for i in range(300)}
+    index = filled_index(scores)
+    for _ in range(2000):
+        user_id = rng.choice(list(scores))
+        points, fish = scores[user_id]
+        scores[user_id] = (points + rng.choice([10, 30, 50]), fish + 1)
+        index.update(user_id, *scores[user_id])
+
+    order = reference_order(scores)
+    assert len(index) == len(order)
+    assert [index.rank(user_id) for user_id in order] == list(range(1, len(order) + 1))
+    assert [key[2] for key in index.slice(40, 60)] == order[40:60]
+    assert index.rank('nobody') is None
+
+
+def test_ties_break_on_fish_then_user_id():
+    index = filled_index({'b': (100, 2), 'a': (100, 2), 'c': (100, 3)})
+    assert [index.rank(user_id) for user_id in ('c', 'a', 'b')] == [1, 2, 3]
+
+
+def test_around_is_clamped_at_both_ends():
+    scores = {f"user{i}": (100 - i, 0) for i in range(10)}
+    index = filled_index(scores)
+
+    top = index.around('user0', 2)
+    assert [(row['rank'], row['user_id']) for row in top] == [(1, 'user0'), (2, 'user1'), (3, 'user2')]
+    assert top[0]['total_points'] == 100
+
+    bottom = index.around('user9', 2)
+    assert [row['rank'] for row in bottom] == [8, 9, 10]
+    assert [row['rank'] for row in index.around('user5', 1)] == [5, 6, 7]
+    assert index.around('nobody', 2) == []
+
+
+def test_rebuild_replays_updates_made_while_reading():
+    index = filled_index({'a': (50, 1), 'b': (40, 1), 'c': (30, 1)})
+
+    index.begin_rebuild()
+    # The snapshot is read from Mongo before and after these updates land
+    snapshot = sorted(RankIndex.key(user_id, points, fish) for user_id, points, fish in (
+        ('a', 50, 1), ('b', 40, 1), ('c', 30, 1), ('d', 45, 1)
+    ))
+    index.update('c', 90, 2)
+    index.update('e', 10, 1)
+    index.finish_rebuild(snapshot, build_rank_tree(snapshot))
+
+    assert [index.rank(user_id) for user_id in ('c', 'a', 'd', 'b', 'e')] == [1, 2, 3, 4, 5]
+    assert len(index) == 5
+
+
+def test_rebuild_keeps_newer_snapshot_over_stale_pending_update():
+    index = filled_index({'a': (10, 1), 'b': (20, 1)})
+
+    index.begin_rebuild()
+    index.update('a', 15, 1)
+    # Another worker has since moved `a` further ahead
+    snapshot = sorted([RankIndex.key('a', 60, 3), RankIndex.key('b', 20, 1)])
+    index.finish_rebuild(snapshot, build_rank_tree(snapshot))
+
+    assert index.rank('a') == 1
+    assert index.around('a', 0)[0]['total_points'] == 60
+
+
+def test_aborted_rebuild_stops_recording():
+    index = filled_index({'a': (10, 1)})
+    index.begin_rebuild()
+    index.abort_rebuild()
+    index.update('a', 20, 1)
+    assert index._pending is None
+    assert index.rank('a') == 1
+
+
+def test_advance_never_moves_a_player_back():
+    index = filled_index({'a': (50, 2), 'b': (40, 1)})
+
+    index.advance('a', 30, 1)
+    index.advance('b', 60, 3)
+    index.advance('c', 45, 1)
+
+    assert [index.rank(user_id) for user_id in ('b', 'a', 'c')] == [1, 2, 3]
+    assert index.around('a', 0)[0]['total_points'] == 50
+
+
+def test_count_through_counts_players_at_or_above_a_position():
+    index = filled_index({'a': (50, 2), 'b': (40, 1), 'c': (30, 1)})
+
+    assert index.count_through(RankIndex.key('b', 40, 1)) == 2
+    # A position nobody holds any more still splits the board correctly
+    assert index.count_through(RankIndex.key('z', 45, 0)) == 1
+    assert index.count_through(RankIndex.key('z', 0, 0)) == 3
+
+
+def test_standing_applies_the_callers_fresh_stats(mongo):
+    async def scenario():
+        await mongo.users.insert_many([{'id': user_id, 'email': f"{user_id}@example.com"} for user_id in 'ab'])
+        await mongo.user_stats.insert_many([
+            {'user_id': 'a', 'email': 'a@example.com', 'total_points': 50, 'total_fish': 2},
+            {'user_id': 'b', 'email': 'b@example.com', 'total_points': 40, 'total_fish': 1}
+        ])
+        await server.rebuild_rank_index()
+        # `b` pulls through another worker; this worker's index has not seen it
+        await mongo.user_stats.update_one({'user_id': 'b'}, {'$set': {'total_points': 90, 'total_fish': 3}})
+        response = await server.get_my_standing(k=1, user={'user_id': 'b', 'email': 'b@example.com'})
+        return json.loads(response.body) if hasattr(response, 'body') else response
+
+    standing = asyncio.run(scenario())
+
+    assert standing['rank'] == 1
+    assert [(row['rank'], row['user_id'], row['total_points']) for row in standing['neighbors']] == [
+        (1, 'b', 90), (2, 'a', 50)
+    ]
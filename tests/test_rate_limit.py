@@ -0,0 +1,53 @@
+import ipaddress
+
+import pytest
+from starlette.requests import Request
+
+import server
+from server import client_ip, parse_trusted_proxies
+
+
+def request_from(peer: str, forwarded_for: str = None) -> Request:
+    headers = [(b'x-forwarded-for', forwarded_for.encode())] if forwarded_for is not None else []
+    return Request({'type': 'http', 'method': 'GET', 'path': '/', 'headers': headers, 'client': (peer, 40000)})
+
+
+@pytest.fixture
+def behind_proxy(monkeypatch):
+    monkeypatch.setattr(server, 'TRUSTED_PROXIES', parse_trusted_proxies('10.0.0.0/8, ::1/128'))
+
+
+def test_parse_trusted_proxies():
+    assert parse_trusted_proxies('*') is True
+    assert parse_trusted_proxies(' ') == ()
+    assert parse_trusted_proxies('10.1.2.3/8,, ::1') == (
+        ipaddress.ip_network('10.0.0.0/8'), ipaddress.ip_network('::1/128')
+    )
+
+
+def test_untrusted_peer_cannot_forward(behind_proxy):
+    assert client_ip(request_from('6.6.6.6', '1.2.3.4')) == '6.6.6.6'
+
+
+def test_trusted_peer_without_header_is_the_client(behind_proxy):
+    assert client_ip(request_from('10.0.0.1')) == '10.0.0.1'
+    assert client_ip(request_from('10.0.0.1', '')) == '10.0.0.1'
+
+
+def test_forwarded_for_is_walked_from_the_right(behind_proxy):
+    # The leftmost entry came from the client and may be forged
+    assert client_ip(request_from('10.0.0.1', '6.6.6.6, 1.2.3.4, 10.1.1.1')) == '1.2.3.4'
+    assert client_ip(request_from('::1', '1.2.3.4')) == '1.2.3.4'
+
+
+def test_unparseable_hop_is_not_trusted(behind_proxy):
+    assert client_ip(request_from('10.0.0.1', '1.2.3.4, junk')) == 'junk'
+
+
+def test_all_trusted_hops_fall_back_to_the_leftmost(behind_proxy):
+    assert client_ip(request_from('10.0.0.1', '10.9.9.9, 10.1.1.1')) == '10.9.9.9'
+
+
+def test_wildcard_trusts_every_hop(monkeypatch):
+    monkeypatch.setattr(server, 'TRUSTED_PROXIES', parse_trusted_proxies('*'))
+    assert client_ip(request_from('6.6.6.6', '1.2.3.4, 5.6.7.8')) == '1.2.3.4'
@@ -0,0 +1,58 @@
+import asyncio
+
+import server
+from server import UserStatsCache
+
+
+def test_put_refuses_an_older_version():
+    cache = UserStatsCache(10, 60)
+    cache.put('a', {'version': 3, 'total_points': 30})
+    # A read that started before the pull finishes after it
+    cache.put('a', {'version': 2, 'total_points': 20})
+    assert cache.get('a')['total_points'] == 30
+    assert cache.stale_writes == 1
+
+    cache.put('a', {'version': 3, 'total_points': 30, 'daily_cases_used': 1})
+    cache.put('a', {'version': 4, 'total_points': 40})
+    assert cache.get('a')['total_points'] == 40
+    assert cache.stale_writes == 1
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(server.time, 'monotonic', lambda: now[0])
+    cache = UserStatsCache(10, 5)
+    cache.put('a', {'version': 1})
+
+    now[0] = 104.9
+    assert cache.get('a') == {'version': 1}
+    now[0] = 105.0
+    assert cache.get('a') is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = UserStatsCache(2, 60)
+    cache.put('a', {'version': 1})
+    cache.put('b', {'version': 1})
+    cache.get('a')
+    cache.put('c', {'version': 1})
+
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    assert cache.snapshot()['size'] == 2
+
+
+def test_disabled_cache_always_reads_through(mongo, monkeypatch):
+    monkeypatch.setattr(server, 'STATS_CACHE', UserStatsCache(10, 60, enabled=False))
+
+    async def scenario():
+        await mongo.user_stats.insert_one({'user_id': 'a', 'version': 1, 'total_points': 10})
+        first = await server.get_stats_doc('a')
+        await mongo.user_stats.update_one({'user_id': 'a'}, {'$set': {'version': 2, 'total_points': 20}})
+        return first, await server.get_stats_doc('a')
+
+    first, second = asyncio.run(scenario())
+
+    assert (first['total_points'], second['total_points']) == (10, 20)
+    assert server.STATS_CACHE.snapshot()['size'] == 0
@@ -0,0 +1,171 @@
+import asyncio
+
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import server
+from server import WriteBehindQueue
+
+
+class FlakyCollection:
+    """Wraps a collection; `failures` lists what each bulk_write call does first."""
+
+    def __init__(self, collection, failures=(), delay: float = 0):
+        self.collection = collection
+        self.failures = list(failures)
+        self.delay = delay
+        self.calls = 0
+
+    async def bulk_write(self, requests, ordered):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        failure = self.failures.pop(0) if self.failures else None
+        if failure == 'down':
+            raise AutoReconnect('connection lost')
+        if failure == 'first_fails':
+            await self.collection.bulk_write(requests[1:], ordered=False)
+            raise BulkWriteError({'writeErrors': [{'index': 0, 'code': 11000, 'errmsg': 'duplicate key'}]})
+        return await self.collection.bulk_write(requests, ordered=ordered)
+
+
+class StubDatabase:
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getitem__(self, name):
+        return self.collection
+
+
+def use_collection(monkeypatch, mongo, **kwargs) -> FlakyCollection:
+    collection = FlakyCollection(mongo.counters, **kwargs)
+    monkeypatch.setattr(server, 'db', StubDatabase(collection))
+    return collection
+
+
+async def documents(mongo) -> list:
+    return await mongo.counters.find({}, {'_id': 0}).sort('k', 1).to_list(None)
+
+
+def test_upserts_with_the_same_filter_are_coalesced(mongo):
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        for value in ('first', 'second', 'third'):
+            await queue.upsert('counters', {'k': 1}, inc={'n': 1}, set_fields={'last': value},
+                               set_on_insert={'created': value})
+        await queue.upsert('counters', {'k': 1}, inc={'m': 5})
+        await queue.insert('counters', {'k': 2, 'n': 0})
+        pending = queue.pending
+        await queue.flush()
+        return pending, await documents(mongo)
+
+    pending, docs = asyncio.run(scenario())
+
+    assert pending == 2
+    assert docs == [
+        {'k': 1, 'n': 3, 'm': 5, 'last': 'third', 'created': 'first'},
+        {'k': 2, 'n': 0}
+    ]
+    assert queue.flushed == 2
+
+
+def test_full_buffer_flushes_before_accepting_more(mongo):
+    queue = WriteBehindQueue(60, 100, max_pending=2)
+
+    async def scenario():
+        for k in range(3):
+            await queue.upsert('counters', {'k': k}, inc={'n': 1})
+        return queue.pending, await mongo.counters.count_documents({})
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_close_waits_for_a_running_flush(mongo, monkeypatch):
+    collection = use_collection(monkeypatch, mongo, delay=0.3)
+    queue = WriteBehindQueue(0.01, 100, 1000)
+
+    async def scenario():
+        queue.start()
+        for k in range(3):
+            await queue.upsert('counters', {'k': k}, inc={'n': 1})
+        await asyncio.sleep(0.1)
+        assert collection.calls == 1 and queue.pending == 0
+        await queue.close()
+        return await documents(mongo)
+
+    assert [doc['n'] for doc in asyncio.run(scenario())] == [1, 1, 1]
+    assert queue.pending == 0
+
+
+def test_close_flushes_what_is_still_buffered(mongo):
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        queue.start()
+        await queue.upsert('counters', {'k': 1}, inc={'n': 2})
+        await queue.close()
+        return await documents(mongo)
+
+    assert asyncio.run(scenario()) == [{'k': 1, 'n': 2}]
+
+
+def test_failed_batch_is_retried_once(mongo, monkeypatch):
+    use_collection(monkeypatch, mongo, failures=['down'])
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        await queue.upsert('counters', {'k': 1}, inc={'n': 1})
+        await queue.flush()
+        assert queue.pending == 1
+        await queue.flush()
+        return await documents(mongo)
+
+    assert asyncio.run(scenario()) == [{'k': 1, 'n': 1}]
+    assert queue.retried == 1
+
+
+def test_operations_failing_twice_are_dropped(mongo, monkeypatch):
+    use_collection(monkeypatch, mongo, failures=['down', 'down'])
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        await queue.upsert('counters', {'k': 1}, inc={'n': 1})
+        await queue.flush()
+        await queue.flush()
+        return await documents(mongo)
+
+    assert asyncio.run(scenario()) == []
+    assert queue.pending == 0
+
+
+def test_partial_failure_requeues_only_the_failed_writes(mongo, monkeypatch):
+    use_collection(monkeypatch, mongo, failures=['first_fails'])
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        for k in range(3):
+            await queue.upsert('counters', {'k': k}, inc={'n': 1})
+        await queue.flush()
+        assert queue.pending == 1
+        await queue.flush()
+        return await documents(mongo)
+
+    assert [doc['n'] for doc in asyncio.run(scenario())] == [1, 1, 1]
+    assert queue.retried == 1
+
+
+def test_requeued_write_merges_with_newer_ones(mongo, monkeypatch):
+    use_collection(monkeypatch, mongo, failures=['down'])
+    queue = WriteBehindQueue(60, 100, 1000)
+
+    async def scenario():
+        await queue.upsert('counters', {'k': 1}, inc={'n': 1}, set_fields={'last': 'old'},
+                           set_on_insert={'created': 'old'})
+        failing = asyncio.create_task(queue.flush())
+        await asyncio.sleep(0)
+        await queue.upsert('counters', {'k': 1}, inc={'n': 5}, set_fields={'last': 'new'},
+                           set_on_insert={'created': 'new'})
+        await failing
+        await queue.flush()
+        return await documents(mongo)
+
+    assert asyncio.run(scenario()) == [{'k': 1, 'n': 6, 'last': 'new', 'created': 'old'}]